@@ -0,0 +1,93 @@
+''' @file benchmarks/intern_memory.py
+@brief Memory benchmark of IniFile(intern=True) over a corpus of similar INI files.
+
+Parses many generated tenant INI files which share their section and key names
+and many of their values, keeps all of the IniFile objects and compares the
+memory they hold, as measured by tracemalloc, with and without interning.
+The parse times are slowed by tracemalloc and are only for comparison.
+Run from the project directory.
+<pre>
+python3 benchmarks/intern_memory.py [--files 200] [--sections 20] [--keys 15] [--engine fast]
+</pre>
+'''
+import sys
+import os
+import random
+import time
+import tracemalloc
+import argparse
+# add the current working directory to the path
+# DO NOT MOVE THE FOLLOWING STATEMENT
+# if using autopep8 formatter, for example, set argument '--ignore=E402'
+sys.path.append(os.getcwd())
+from python_ini.ini_file import IniFile
+
+COMMON = ['localhost', 'info', 'debug', 'utf-8', 'UTC', 'eu-west-1', 'us-east-1',
+          '/var/lib/service', '/var/log/service', 'postgresql', 'round-robin']
+
+
+def tenant_file(rng, tenant, sections, keys):
+    '''Generate the INI file of a tenant.
+    The section and key names are the same in every file.
+    Most string values are from a small common set and the rest are unique to the tenant.
+    '''
+    lines = ['tenant = "tenant_%d"\n' % tenant, 'enabled = true\n']
+    for s in range(sections):
+        lines.append('[service_section_%d]\n' % s)
+        for k in range(keys):
+            r = rng.random()
+            if(r < 0.6):
+                value = rng.choice(COMMON)
+            elif(r < 0.8):
+                value = str(rng.randint(0, 65535))
+            else:
+                value = '"tenant_%d_value_%d_%d"' % (tenant, s, k)
+            lines.append('configuration_key_%d = %s\n' % (k, value))
+    return ''.join(lines)
+
+
+def measure(texts, engine, intern):
+    '''Parse the texts and keep the results.
+    @returns Returns the memory held by the results in bytes and the parse time in seconds.
+    '''
+    # the shared parser is prepared before the measurement
+    IniFile(engine=engine).parse(fstr=texts[0])
+    tracemalloc.start()
+    start = time.perf_counter()
+    inis = []
+    for text in texts:
+        ini = IniFile(engine=engine, intern=intern)
+        ini.parse(fstr=text)
+        inis.append(ini)
+    seconds = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, seconds
+
+
+def main():
+    ap = argparse.ArgumentParser(description='IniFile(intern=True) memory benchmark')
+    ap.add_argument('--files', type=int, default=200,
+                    help='number of tenant INI files')
+    ap.add_argument('--sections', type=int, default=20,
+                    help='sections per file')
+    ap.add_argument('--keys', type=int, default=15,
+                    help='keys per section')
+    ap.add_argument('--engine', default='fast', choices=['apg', 'fast'],
+                    help='the parsing engine')
+    args = ap.parse_args()
+    rng = random.Random(1)
+    texts = [tenant_file(rng, i, args.sections, args.keys) for i in range(args.files)]
+    print('%d files, %d keys each, %d bytes' % (
+        args.files, args.sections * args.keys + 2, sum(len(text) for text in texts)))
+    print('%8s %12s %10s' % ('intern', 'memory', 'time'))
+    results = {}
+    for intern in [False, True]:
+        held, seconds = measure(texts, args.engine, intern)
+        results[intern] = held
+        print('%8s %10.1fMB %9.2fs' % (intern, held / 1e6, seconds))
+    print('reduction %.1f%%' % (100 * (1 - results[True] / results[False])))
+
+
+if __name__ == '__main__':
+    main()
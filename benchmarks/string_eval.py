@@ -0,0 +1,103 @@
+''' @file benchmarks/string_eval.py
+@brief Micro-benchmark of the string value unescaper, ast_callbacks.string_eval().
+
+Compares string_eval() with the original character-at-a-time evaluation
+over long values with 0%, 1% and 50% escaped characters.
+Run from the project directory.
+<pre>
+python3 benchmarks/string_eval.py [--length 100000] [--repeat 5]
+</pre>
+'''
+import sys
+import os
+import random
+import timeit
+import argparse
+# add the current working directory to the path
+# DO NOT MOVE THE FOLLOWING STATEMENT
+# if using autopep8 formatter, for example, set argument '--ignore=E402'
+sys.path.append(os.getcwd())
+from python_ini.ast_callbacks import string_eval, hex_digit
+
+ESCAPES = ['\\\\', '\\"', '\\#', '\\,', '\\b', '\\t', '\\n', '\\r',
+           '\\x41', '\\xfF', '\\u0041', '\\uFFFD', '\\U0001F600']
+PLAIN = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+/'
+
+
+def char_eval(input):
+    '''The original evaluation, one character code at a time.'''
+    value = ''
+    skip = 0
+    for i in range(len(input)):
+        if(skip):
+            skip -= 1
+        else:
+            if(input[i] == 92):
+                if(input[i + 1] == 120):
+                    n = 2
+                elif(input[i + 1] == 117):
+                    n = 4
+                elif(input[i + 1] == 85):
+                    n = 8
+                else:
+                    n = 0
+                if(n):
+                    c = 0
+                    for j in range(i + 2, i + 2 + n):
+                        c = 16 * c + hex_digit(input[j])
+                    value += chr(c)
+                    skip = n + 1
+                else:
+                    c = input[i + 1]
+                    if(c == 116):
+                        c = 0x09
+                    elif(c == 114):
+                        c = 0x0D
+                    elif(c == 110):
+                        c = 0x0A
+                    elif(c == 98):
+                        c = 0x20
+                    value += chr(c)
+                    skip = 1
+            else:
+                value += chr(input[i])
+    return value
+
+
+def value_text(rng, length, density):
+    '''Generate a string value of about length characters
+    where density is the fraction of escaped characters.'''
+    out = []
+    for i in range(length):
+        if(rng.random() < density):
+            out.append(rng.choice(ESCAPES))
+        else:
+            out.append(rng.choice(PLAIN))
+    return ''.join(out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='string_eval() micro-benchmark')
+    ap.add_argument('--length', type=int, default=100000,
+                    help='characters per value')
+    ap.add_argument('--repeat', type=int, default=5,
+                    help='evaluations per measurement')
+    args = ap.parse_args()
+    rng = random.Random(1)
+    print('%8s %12s %12s %8s' % ('escapes', 'string_eval', 'char_eval', 'speedup'))
+    for density in [0.0, 0.01, 0.5]:
+        text = value_text(rng, args.length, density)
+        chars = text.encode('ascii')
+        if(string_eval(text) != char_eval(chars)):
+            raise Exception('string_eval() and char_eval() differ', density)
+        new = min(timeit.repeat(lambda: string_eval(text),
+                                number=args.repeat, repeat=3))
+        old = min(timeit.repeat(lambda: char_eval(chars),
+                                number=args.repeat, repeat=3))
+        print('%7d%% %10.3fms %10.3fms %7.1fx' % (
+            100 * density, 1000 * new / args.repeat,
+            1000 * old / args.repeat, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+''' @file benchmarks/writer_strings.py
+@brief Benchmark of the IniWriter string value escaping.
+
+Compares IniWriter.key() string values with the original
+character-at-a-time escaping over ASCII-only, Latin-1 and astral-plane
+(non-BMP) values and checks that the output is identical.
+Run from the project directory.
+<pre>
+python3 benchmarks/writer_strings.py [--length 100000] [--repeat 5]
+</pre>
+'''
+import sys
+import os
+import random
+import timeit
+import argparse
+# add the current working directory to the path
+# DO NOT MOVE THE FOLLOWING STATEMENT
+# if using autopep8 formatter, for example, set argument '--ignore=E402'
+sys.path.append(os.getcwd())
+from python_ini.ini_writer import IniWriter
+
+
+def char_escape(string):
+    '''The original escaping, one character at a time.'''
+    v = ''
+    for s in string:
+        c = ord(s)
+        if(c >= 32 and c <= 126):
+            v += s
+        elif(c == 9):
+            v += '\\t'
+        elif(c == 10):
+            v += '\\n'
+        elif(c == 13):
+            v += '\\r'
+        elif(c <= 0xff):
+            h = str(hex(c))
+            h = h[2:]
+            if(len(h) == 1):
+                h = '0' + h
+            v += '\\x' + h
+        elif(c < 0xd800 or (c >= 0xe000 and c <= 0xffff)):
+            h = str(hex(c))
+            h = h[2:]
+            while(len(h) < 4):
+                h = '0' + h
+            v += '\\u' + h
+        elif(c >= 0xd800 and c < 0xe000):
+            raise Exception(
+                'IniWriter: string has Unicode surrogate value', string)
+        else:
+            h = str(hex(c))
+            h = h[2:]
+            while(len(h) < 8):
+                h = '0' + h
+            v += '\\U' + h
+    return "'" + v + "'"
+
+
+def writer_escape(string):
+    w = IniWriter()
+    w.key('k', string)
+    return w.to_string()[4:-1]
+
+
+def value_text(rng, length, kind):
+    '''Generate a string value of length characters.'''
+    ascii = [chr(c) for c in range(32, 127)]
+    if(kind == 'ascii'):
+        chars = ascii
+    elif(kind == 'latin-1'):
+        chars = ascii + [chr(c) for c in range(160, 256)] + ['\t', '\n']
+    else:
+        chars = ascii + ['\U0001F600', '\U00020000', '\U0010ffff', '']
+    return ''.join(rng.choice(chars) for i in range(length))
+
+
+def main():
+    ap = argparse.ArgumentParser(description='IniWriter string escaping benchmark')
+    ap.add_argument('--length', type=int, default=100000,
+                    help='characters per value')
+    ap.add_argument('--repeat', type=int, default=5,
+                    help='escapes per measurement')
+    args = ap.parse_args()
+    rng = random.Random(1)
+    print('%8s %12s %12s %8s' % ('input', 'IniWriter', 'char_escape', 'speedup'))
+    for kind in ['ascii', 'latin-1', 'astral']:
+        text = value_text(rng, args.length, kind)
+        if(writer_escape(text) != char_escape(text)):
+            raise Exception('IniWriter and char_escape() differ', kind)
+        new = min(timeit.repeat(lambda: writer_escape(text),
+                                number=args.repeat, repeat=3))
+        old = min(timeit.repeat(lambda: char_escape(text),
+                                number=args.repeat, repeat=3))
+        print('%8s %10.3fms %10.3fms %7.1fx' % (
+            kind, 1000 * new / args.repeat, 1000 * old / args.repeat, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,39 +7,181 @@
 # DO NOT MOVE THE FOLLOWING STATEMENT
 # if using autopep8 formatter, for example, set argument '--ignore=E402'
 # sys.path.append(os.getcwd())
+import re
+from sys import intern
 from apg_py.lib import identifiers as id
-from apg_py.lib import utilities as utils
+
+
+def phrase(input, index, length):
+    '''Get a matched phrase as a string.
+    @param input The parser's input buffer, ASCII bytes (bytes, memoryview or mmap)
+    or character codes (array or tuple).
+    @param index The index of the first character of the phrase.
+    @param length The number of characters in the phrase.
+    @returns Returns the phrase as a string.
+    '''
+    chars = input[index:index + length]
+    if(isinstance(chars, (bytes, bytearray, memoryview))):
+        return str(chars, 'ascii')
+    return ''.join(map(chr, chars))
+
+
+class LazyValue:
+    '''A value recorded as its source text and kind (its decoding function)
+    and decoded only on first access, see IniFile(lazy=True).'''
+    __slots__ = ('decode', 'source')
+
+    def __init__(self, decode, source):
+        self.decode = decode
+        self.source = source
+
+    def value(self):
+        return self.decode(self.source)
+
+
+def string_decode(data, text):
+    '''Evaluate a string value now or, if data['lazy'] is True,
+    record it for evaluation on first access.
+    Only strings with escaped characters are worth deferring.
+    A LazyValue is larger and slower to create than a converted number or a plain string.
+    @param data The translation data.
+    @param text The string value as matched by the parser.
+    @returns Returns the string or a LazyValue.
+    '''
+    if(data.get('lazy') and '\\' in text):
+        return LazyValue(string_eval, text)
+    return string_eval(text)
+
+
+# string values up to this length are interned with IniFile(intern=True)
+INTERN_MAX = 64
+
+
+def intern_value(value):
+    '''Intern a short string value, see IniFile(intern=True).
+    @param value The value.
+    @returns Returns the interned string or, if not a short string, the value.
+    '''
+    if(type(value) is str and len(value) <= INTERN_MAX):
+        return intern(value)
+    return value
+
+
+# The section/key/value helpers are shared with the fast line scanner
+# (fast_scanner.py) so that both engines build identical data.
+# If data has an "events" list, the sections and keys are recorded there
+# in input order, [section, key, values], instead of in the sections dictionary.
+# If data has a "schema" (see schema.py), sections, keys and values are validated
+# and the errors are reported with the line number in data['line'].
+# If data['intern'] is True, the section and key names and the short string values
+# are interned, so that the same names in many parsed files are a single string.
+def open_section(data, name):
+    if(data.get('intern')):
+        name = intern(name)
+    if(name != data['current_section']):
+        data['current_section'] = name
+    events = data.get('events')
+    if(events is not None):
+        events.append([name, None, []])
+        return
+    schema = data.get('schema')
+    if(schema is not None and not schema.open_section(data, name)):
+        return
+    if(not data['sections'].get(name)):
+        data['sections'][name] = {}
+
+
+def open_key(data, name):
+    if(data.get('intern')):
+        name = intern(name)
+    data['current_key'] = name
+    events = data.get('events')
+    if(events is not None):
+        events.append([data['current_section'], name, []])
+        return
+    schema = data.get('schema')
+    if(schema is not None and not schema.open_key(data, name)):
+        data['current_key'] = None
+        return
+    if(data['current_section']):
+        section = data['sections'][data['current_section']]
+    else:
+        section = data['global']
+    key = section.get(name)
+    if(schema is not None):
+        # a new key whose values are all rejected is not kept, see add_value()
+        data['schema_new'] = key is None
+    if(not key):
+        section[name] = []
+
+
+def add_value(data, value):
+    events = data.get('events')
+    if(events is not None):
+        events[-1][2].append(value)
+        return
+    if(data['current_key'] is None):
+        # the key was rejected by the schema
+        return
+    if(data['current_section']):
+        section = data['sections'][data['current_section']]
+    else:
+        section = data['global']
+    schema = data.get('schema')
+    if(schema is not None):
+        name = data['current_key']
+        values = section.get(name)
+        value, valid = schema.check_value(data, values or [], value)
+        if(not valid):
+            if(not values and data['schema_new']):
+                # otherwise the key would be a true flag
+                section.pop(name, None)
+            return
+        if(values is None):
+            values = section[name] = []
+    else:
+        values = section[data['current_key']]
+    if(data.get('intern')):
+        # after the schema check, which may decode a lazy value
+        value = intern_value(value)
+    values.append(value)
+
+
+def line_of(data, input, index):
+    '''Find the physical line number of a phrase for the schema error reports.
+    The line ends are counted from the last position looked up,
+    data['line_cursor'], so the lookups must be in input order.
+    @param data The translation data.
+    @param input The parser's input buffer.
+    @param index The index of the phrase.
+    @returns Returns the line number.
+    '''
+    begin, line = data['line_cursor']
+    chars = input[begin:index]
+    if(not isinstance(chars, bytes)):
+        chars = bytes(chars)
+    line += chars.count(b'\n') + chars.count(b'\r') - chars.count(b'\r\n')
+    data['line_cursor'] = (index, line)
+    return line
 
 
 def section_name(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        name = utils.tuple_to_string(input[index:index + length])
-        if(name != data['current_section']):
-            data['current_section'] = name
-        if(not data['sections'].get(name)):
-            data['sections'][name] = {}
+        if(data.get('schema') is not None):
+            data['line'] = line_of(data, input, index)
+        open_section(data, phrase(input, index, length))
 
 
 def key_name(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        name = utils.tuple_to_string(input[index:index + length])
-        if(data['current_section']):
-            section = data['sections'][data['current_section']]
-        else:
-            section = data['global']
-        key = section.get(name)
-        if(not key):
-            section[name] = []
-        data['current_key'] = name
+        if(data.get('schema') is not None):
+            data['line'] = line_of(data, input, index)
+        open_key(data, phrase(input, index, length))
 
 
 def value(state, input, index, length, data):
     if(state == id.SEM_POST):
-        if(data['current_section']):
-            section = data['sections'][data['current_section']]
-        else:
-            section = data['global']
-        section[data['current_key']].append(data['value'])
+        add_value(data, data['value'])
 
 
 def hex_digit(d):
@@ -52,83 +194,79 @@ def hex_digit(d):
     raise Exception('bad hex digit', d)
 
 
-def string_eval(input):
-    value = ''
-    skip = 0
-    for i in range(len(input)):
-        if(skip):
-            skip -= 1
+# an escaped character: \xhh, \uhhhh, \Uhhhhhhhh or \c
+ESCAPE = re.compile(r'(\\(?:x..|u....|U........|.))', re.S)
+SINGLE_ESCAPES = {'t': '\t', 'r': '\r', 'n': '\n', 'b': ' '}
+
+
+def hex_value(digits):
+    try:
+        return int(digits, 16)
+    except ValueError:
+        # the UDT hex digits also accept G and H, see parser_callbacks.hex_digit()
+        value = 0
+        for d in digits:
+            value = 16 * value + hex_digit(ord(d))
+        return value
+
+
+class EscapeTable(dict):
+    '''Maps escape sequences, "\\x41", "\\t", etc., to their characters.
+    Sequences are evaluated on first use and kept, up to a limit.'''
+
+    def __missing__(self, escape):
+        if(len(escape) > 2):
+            c = chr(hex_value(escape[2:]))
         else:
-            if(input[i] == 92):
-                if(input[i + 1] == 120):
-                    c = hex_digit(input[i + 2])
-                    c = 16 * c + hex_digit(input[i + 3])
-                    value += chr(c)
-                    skip = 3
-                elif(input[i + 1] == 117):
-                    c = hex_digit(input[i + 2])
-                    c = 16 * c + hex_digit(input[i + 3])
-                    c = 16 * c + hex_digit(input[i + 4])
-                    c = 16 * c + hex_digit(input[i + 5])
-                    value += chr(c)
-                    skip = 5
-                elif(input[i + 1] == 85):
-                    c = hex_digit(input[i + 2])
-                    c = 16 * c + hex_digit(input[i + 3])
-                    c = 16 * c + hex_digit(input[i + 4])
-                    c = 16 * c + hex_digit(input[i + 5])
-                    c = 16 * c + hex_digit(input[i + 6])
-                    c = 16 * c + hex_digit(input[i + 7])
-                    c = 16 * c + hex_digit(input[i + 8])
-                    c = 16 * c + hex_digit(input[i + 9])
-                    value += chr(c)
-                    skip = 9
-                else:
-                    if(input[i + 1] == 116):
-                        value += chr(0x09)
-                    elif(input[i + 1] == 114):
-                        value += chr(0x0D)
-                    elif(input[i + 1] == 110):
-                        value += chr(0x0A)
-                    elif(input[i + 1] == 98):
-                        value += chr(0x20)
-                    else:
-                        value += chr(input[i + 1])
-                    skip = 1
-            else:
-                value += chr(input[i])
-    return value
+            c = SINGLE_ESCAPES.get(escape[1], escape[1])
+        if(len(self) < 4096):
+            self[escape] = c
+        return c
+
+
+ESCAPE_TABLE = EscapeTable()
+
+
+def string_eval(text):
+    '''Evaluate the escaped characters in a string value.
+    The runs of characters between escapes are copied in bulk.
+    re.split() puts the escapes at the odd indexes.
+    @param text The string value as matched by the parser.
+    @returns Returns the string value.
+    '''
+    if('\\' not in text):
+        return text
+    parts = ESCAPE.split(text)
+    parts[1::2] = map(ESCAPE_TABLE.__getitem__, parts[1::2])
+    return ''.join(parts)
 
 
 def d_value(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        data['value'] = string_eval(input[index:index + length])
+        data['value'] = string_decode(
+            data, phrase(input, index, length))
 
 
 def s_value(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        data['value'] = string_eval(input[index:index + length])
+        data['value'] = string_decode(
+            data, phrase(input, index, length))
 
 
 def string_value(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        data['value'] = string_eval(input[index:index + length])
-        a = data['value']
-        b = a
+        data['value'] = string_decode(
+            data, phrase(input, index, length))
 
 
 def float_value(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        value = utils.tuple_to_string(input[index:index + length])
-        data['value'] = float(value)
-        a = data['value']
-        b = a
+        data['value'] = float(phrase(input, index, length))
 
 
 def int_value(state, input, index, length, data):
     if(state == id.SEM_PRE):
-        value = utils.tuple_to_string(input[index:index + length])
-        data['value'] = int(value)
+        data['value'] = int(phrase(input, index, length))
 
 
 def true_value(state, input, index, length, data):
@@ -0,0 +1,219 @@
+''' @file python_ini/cache.py
+@brief Caches of parsed INI file data for IniFile(cache=...).
+
+The cached data is the tuple (global, sections, errors) of IniFile._export(),
+stored in the marshal format. Each cache hit loads a fresh copy, so
+the values returned by one IniFile object never change another's.
+'''
+import os
+import hashlib
+import marshal
+import tempfile
+import threading
+from collections import OrderedDict
+
+# the format of the parsed data, increase it whenever a change to the parser
+# or the translation changes the parsed data of any INI file
+FORMAT = 1
+
+
+def package_version():
+    '''Get the installed version of the python-ini package.
+    @returns Returns the version or None if the package is not installed,
+    for example if it is run from a source checkout.
+    '''
+    try:
+        from importlib.metadata import version
+        return version('python-ini')
+    except Exception:
+        # Python 3.7 has no importlib.metadata
+        return None
+
+
+# the parsed data depends on the data format and on the installed package version
+VERSION = '%d %s' % (FORMAT, package_version())
+
+
+def file_stamp(fname):
+    '''Get the current stat() stamp of a file, its modification time, size and identity.
+    @param fname The file name.
+    @returns Returns the stamp. Raises an OSError if the file does not exist.
+    '''
+    st = os.stat(fname)
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev)
+
+
+class Lru:
+    '''A thread-safe, size-bounded dictionary with least-recently-used eviction.'''
+
+    def __init__(self, size):
+        if(not (isinstance(size, int) and size > 0)):
+            raise Exception('cache size must be a positive integer', size)
+        self.size = size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if(entry is not None):
+                self.__entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while(len(self.__entries) > self.size):
+                self.__entries.popitem(last=False)
+
+    def remove(self, key):
+        with self.__lock:
+            return self.__entries.pop(key, None) is not None
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+
+class ParseCache:
+    '''A parse cache keyed by a hash of the INI file content.
+    The parsed data is kept in a memory LRU and, optionally, in a directory on disk
+    so that it persists across processes.'''
+
+    def __init__(self, size=256, directory=None):
+        '''ParseCache constructor.
+        @param size The maximum number of entries in memory.
+        @param directory If not None, the name of a directory where entries are
+        also saved, one file per entry. The directory is created if necessary.
+        '''
+        self.__entries = Lru(size)
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        if(directory):
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, input):
+        '''Compute the cache key of an INI file.
+        @param input The INI file as a string or bytes-like object.
+        @returns Returns the key as a hexadecimal string.
+        '''
+        h = hashlib.blake2b(digest_size=20)
+        h.update(('python-ini %s marshal %d\n' %
+                  (VERSION, marshal.version)).encode('ascii'))
+        if(isinstance(input, str)):
+            input = input.encode('utf-8', 'surrogatepass')
+        h.update(input)
+        return h.hexdigest()
+
+    def get(self, key):
+        '''Get the parsed data for a key.
+        @param key The cache key.
+        @returns Returns the parsed data or None if not cached.
+        '''
+        entry = self.__entries.get(key)
+        data = None
+        if(entry is not None):
+            data = marshal.loads(entry)
+        elif(self.directory):
+            try:
+                with open(self.__path(key), 'rb') as fd:
+                    entry = fd.read()
+                data = marshal.loads(entry)
+                self.__entries.put(key, entry)
+            except (OSError, EOFError, ValueError, TypeError):
+                # missing or unreadable entry
+                data = None
+        if(data is None):
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        '''Add the parsed data for a key.
+        @param key The cache key.
+        @param data The parsed data, see IniFile._export().
+        '''
+        entry = marshal.dumps(data)
+        self.__entries.put(key, entry)
+        if(self.directory):
+            # write to a temporary file and rename so that readers never see a partial file
+            fd, temp = tempfile.mkstemp(dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(entry)
+                os.replace(temp, self.__path(key))
+            except OSError:
+                os.remove(temp)
+                raise
+
+    def clear(self):
+        '''Remove all entries from memory (not from the directory) and reset the counters.'''
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + '.marshal')
+
+
+class FileCache:
+    '''A parse cache for parse(fname=...) validated with os.stat().
+    A file whose modification time (in nanoseconds), size, inode and device
+    are unchanged since it was parsed is neither read nor parsed again.'''
+
+    def __init__(self, size=256):
+        '''FileCache constructor.
+        @param size The maximum number of files kept.
+        '''
+        self.__entries = Lru(size)
+        self.hits = 0
+        self.misses = 0
+
+    def stamp(self, fname):
+        '''Get the current stat() stamp of a file.
+        The stamp must be taken before the file is read.
+        If the file changes after that, the next stamp will differ.
+        @param fname The file name.
+        @returns Returns the stamp. Raises an OSError if the file does not exist.
+        '''
+        return file_stamp(fname)
+
+    def get(self, fname, stamp):
+        '''Get the parsed data for a file.
+        @param fname The file name.
+        @param stamp The file's current stamp.
+        @returns Returns the parsed data or None if not cached or the file has changed.
+        '''
+        entry = self.__entries.get(os.path.abspath(fname))
+        if(entry is None or entry[0] != stamp):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return marshal.loads(entry[1])
+
+    def put(self, fname, stamp, data):
+        '''Add the parsed data for a file.
+        @param fname The file name.
+        @param stamp The file's stamp, taken before it was read.
+        @param data The parsed data, see IniFile._export().
+        '''
+        self.__entries.put(os.path.abspath(fname), (stamp, marshal.dumps(data)))
+
+    def invalidate(self, fname):
+        '''Remove a file from the cache.
+        @param fname The file name.
+        @returns Returns True if the file was cached.
+        '''
+        return self.__entries.remove(os.path.abspath(fname))
+
+    def clear(self):
+        '''Remove all files and reset the counters.'''
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
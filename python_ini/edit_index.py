@@ -0,0 +1,637 @@
+''' @file python_ini/edit_index.py
+@brief The line index of an editable IniFile, see IniFile(editable=True) and IniFile.apply_edit().
+
+The INI file text is kept as a list of records, one for each logical line.
+A logical line is a physical line or, since a forward slash(/) may begin a
+line continuation, a run of lines which all but the last contain a forward slash.
+A logical line never runs on past a line without a forward slash,
+so each record can be parsed on its own.
+Each record keeps its parse results, the section lines, the key lines and the errors,
+so that an edit parses again only the records that it changes.
+
+The section/key/value dictionaries are patched from the records.
+The values of a key are the values of all of its key lines in file order,
+and the sections and keys are in the order of their first lines,
+exactly as the AST translation builds them.
+The keys before the first section line of a record belong to the section of
+the record before it. If an edit changes that section, the following records
+are moved to the new section, up to the next section line, without parsing them again.
+
+The records are ordered by an order number. New records are numbered between their
+neighbors, so the order numbers of the other records never change.
+
+The records are kept in blocks (see RecordList) with the sums of the lines of each block
+in Fenwick trees, so that finding the record of a line and the line number of a record
+take O(log n) time and an edit does work in proportion to its size, not to the file size.
+The error reports keep their line numbers relative to their record and the file line
+numbers are found only when the errors are displayed.
+'''
+from fractions import Fraction
+from itertools import islice
+from sys import intern
+from python_ini.fast_scanner import LINE
+from python_ini.ast_callbacks import intern_value
+
+# the section of the key lines before the first section line of a record
+INHERIT = object()
+# the initial spacing of the record order numbers
+SPACING = 1 << 64
+# the number of records of a block, blocks of more than twice as many are split
+BLOCK = 128
+
+
+class Record:
+    '''A logical line.'''
+    __slots__ = ('text', 'order', 'headers', 'events', 'errors', 'section', 'values', 'block')
+
+    def __init__(self, text, headers, events, errors):
+        self.text = text
+        self.order = 0
+        # the section names of the section lines
+        self.headers = headers
+        # (section, key, values) for each key line, the section is INHERIT
+        # for the key lines before the first section line
+        self.events = events
+        # the error reports, the line numbers count from 1 at the beginning of the record
+        self.errors = errors
+        # the section at the beginning of the record and
+        # the values of each (section, key) of the record, see EditIndex.attach()
+        self.section = None
+        self.values = None
+        # the RecordList block of the record
+        self.block = None
+
+    def out(self):
+        # the section at the end of the record
+        return self.headers[-1] if(self.headers) else self.section
+
+
+def split_lines(text):
+    '''Split text into physical lines.
+    @param text The text.
+    @returns Returns the list of lines, with their line ends.
+    '''
+    lines = []
+    index = 0
+    end = len(text)
+    while(index < end):
+        m = LINE.match(text, index)
+        lines.append(m.group())
+        index = m.end()
+    return lines
+
+
+def last_line(text):
+    # the last line of a non-empty text, without its line end
+    end = len(text)
+    if(text.endswith('\r\n')):
+        end -= 2
+    elif(text[-1] == '\n' or text[-1] == '\r'):
+        end -= 1
+    begin = max(text.rfind('\n', 0, end), text.rfind('\r', 0, end)) + 1
+    return text[begin:end]
+
+
+def logical_lines(text):
+    '''Split text into logical lines.
+    @param text The text.
+    @returns Returns a list of (text, count) for each logical line,
+    where count is the number of physical lines.
+    '''
+    out = []
+    begin = 0
+    index = 0
+    count = 0
+    end = len(text)
+    while(index < end):
+        m = LINE.match(text, index)
+        index = m.end()
+        count += 1
+        if(m.group(2) is None or '/' not in m.group(1)):
+            out.append((text[begin:index], count))
+            begin = index
+            count = 0
+    if(begin < end):
+        out.append((text[begin:], count))
+    return out
+
+
+def bound(records, order, upper=False):
+    # the index of the first record of a list ordered by record order
+    # with an order number not less than (or, if upper, greater than) order
+    lo = 0
+    hi = len(records)
+    while(lo < hi):
+        mid = (lo + hi) // 2
+        if(records[mid].order < order or (upper and records[mid].order == order)):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def insert(records, record):
+    # insert a record in a list ordered by record order
+    if(not records or records[-1].order < record.order):
+        records.append(record)
+    else:
+        records.insert(bound(records, record.order), record)
+
+
+def reorder(keys, rank):
+    # put a dictionary's keys in order of their first lines
+    items = sorted(keys.items(), key=lambda item: rank(item[0]))
+    keys.clear()
+    keys.update(items)
+
+
+class Fenwick:
+    '''A Fenwick (binary indexed) tree of the sums of a list of non-negative numbers.'''
+    __slots__ = ('tree',)
+
+    def __init__(self, values):
+        tree = [0]
+        tree.extend(values)
+        n = len(tree)
+        for i in range(1, n):
+            j = i + (i & -i)
+            if(j < n):
+                tree[j] += tree[i]
+        self.tree = tree
+
+    def add(self, index, delta):
+        # add delta to the number at index
+        tree = self.tree
+        index += 1
+        n = len(tree)
+        while(index < n):
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        # the sum of the numbers before index
+        tree = self.tree
+        total = 0
+        while(index > 0):
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, target):
+        # the smallest index whose sum of the numbers up to and including it is
+        # at least target, for target > 0, or the length if the total is less than target
+        tree = self.tree
+        n = len(tree) - 1
+        index = 0
+        step = 1 << n.bit_length()
+        while(step):
+            next = index + step
+            if(next <= n and tree[next] < target):
+                index = next
+                target -= tree[next]
+            step >>= 1
+        return index
+
+
+class Block:
+    '''A run of records and the number of physical lines and parser lines of each.'''
+    __slots__ = ('records', 'counts', 'advances', 'lines', 'steps', 'index')
+
+    def __init__(self, records, counts, advances):
+        self.records = records
+        self.counts = counts
+        self.advances = advances
+        # the sums of the counts and advances
+        self.lines = sum(counts)
+        self.steps = sum(advances)
+        # the index in RecordList.blocks
+        self.index = 0
+        for record in records:
+            record.block = self
+
+
+class RecordList:
+    '''The records in file order, in blocks.
+    Fenwick trees of the number of records, physical lines and parser lines of the blocks
+    find a record by its index or by one of its lines, in O(log n + BLOCK) time.
+    A replacement of records updates the blocks and the trees in the same time, except
+    that a block of more than 2 * BLOCK records is split, and the blocks are compacted
+    when more than half of them are empty, which rebuild the trees in O(n / BLOCK) time.
+    '''
+
+    def __init__(self):
+        self.blocks = [Block([], [], [])]
+        # the number of records, physical lines and empty blocks
+        self.length = 0
+        self.lines = 0
+        self.empty = 1
+        self.rebuild()
+
+    def rebuild(self):
+        # number the blocks and build the trees
+        for index, block in enumerate(self.blocks):
+            block.index = index
+        self.sizes = Fenwick(len(block.records) for block in self.blocks)
+        self.line_sums = Fenwick(block.lines for block in self.blocks)
+        self.step_sums = Fenwick(block.steps for block in self.blocks)
+
+    def locate(self, index):
+        # the block of the record at index and the record's place in the block
+        b = self.sizes.search(index + 1)
+        return self.blocks[b], index - self.sizes.prefix(b)
+
+    def get(self, index):
+        '''Get the record at an index.'''
+        block, offset = self.locate(index)
+        return block.records[offset]
+
+    def find(self, line):
+        '''Find the record of a physical line.
+        @param line The line number, counting from 1.
+        @returns Returns a tuple (index, before) of the index of the record and the number
+        of lines before it. If the line is past the last line, the index is the number of records.
+        '''
+        if(line > self.lines):
+            return self.length, self.lines
+        b = self.line_sums.search(line)
+        block = self.blocks[b]
+        before = self.line_sums.prefix(b)
+        index = self.sizes.prefix(b)
+        for count in block.counts:
+            if(before + count >= line):
+                break
+            before += count
+            index += 1
+        return index, before
+
+    def steps_before(self, record):
+        '''Get the number of parser lines before a record.'''
+        block = record.block
+        offset = block.records.index(record)
+        return self.step_sums.prefix(block.index) + sum(block.advances[:offset])
+
+    def iterate(self, index):
+        '''Iterate over the records from an index on.'''
+        if(index >= self.length):
+            return
+        block, offset = self.locate(index)
+        for b in range(block.index, len(self.blocks)):
+            yield from self.blocks[b].records[offset:]
+            offset = 0
+
+    def replace(self, block, begin, end, records, counts, advances):
+        # replace the records begin to end - 1 of a block
+        was_empty = not block.records
+        size = len(records) - (end - begin)
+        lines = sum(counts) - sum(block.counts[begin:end])
+        steps = sum(advances) - sum(block.advances[begin:end])
+        block.records[begin:end] = records
+        block.counts[begin:end] = counts
+        block.advances[begin:end] = advances
+        for record in records:
+            record.block = block
+        block.lines += lines
+        block.steps += steps
+        self.sizes.add(block.index, size)
+        self.line_sums.add(block.index, lines)
+        self.step_sums.add(block.index, steps)
+        self.length += size
+        self.lines += lines
+        self.empty += (not block.records) - was_empty
+
+    def splice(self, first, stop, items):
+        '''Replace the records first to stop - 1.
+        @param first The index of the first record to replace.
+        @param stop The index of the record after the last to replace, first to insert.
+        @param items The list of (record, count, advance) of the new records.
+        '''
+        records = [item[0] for item in items]
+        counts = [item[1] for item in items]
+        advances = [item[2] for item in items]
+        if(first < self.length):
+            block, begin = self.locate(first)
+        else:
+            block = self.blocks[-1]
+            begin = len(block.records)
+        if(stop > first):
+            last, end = self.locate(stop - 1)
+            end += 1
+        else:
+            last, end = block, begin
+        if(last is block):
+            self.replace(block, begin, end, records, counts, advances)
+        else:
+            self.replace(block, begin, len(block.records), records, counts, advances)
+            for b in range(block.index + 1, last.index):
+                middle = self.blocks[b]
+                self.replace(middle, 0, len(middle.records), [], [], [])
+            self.replace(last, 0, end, [], [], [])
+        if(len(block.records) > 2 * BLOCK):
+            # split the block
+            parts = []
+            for i in range(0, len(block.records), BLOCK):
+                parts.append(Block(block.records[i:i + BLOCK], block.counts[i:i + BLOCK],
+                                   block.advances[i:i + BLOCK]))
+            self.blocks[block.index:block.index + 1] = parts
+            self.rebuild()
+        elif(self.empty > 1 and 2 * self.empty > len(self.blocks)):
+            # remove the empty blocks
+            self.blocks = [block for block in self.blocks if(block.records)] or \
+                [Block([], [], [])]
+            self.empty = 0 if(self.blocks[0].records) else 1
+            self.rebuild()
+
+
+class EditIndex:
+    '''The logical line records of an INI file and the data built from them.'''
+
+    def __init__(self, data, scan):
+        '''EditIndex constructor.
+        @param data The IniFile data, see ast_callbacks.py.
+        Its global and sections dictionaries are replaced and then patched by edit().
+        @param scan A function, scan(text), which parses the text of logical lines
+        and returns a scan_events() generator, see fast_scanner.py.
+        '''
+        self.data = data
+        self.scan = scan
+        self.reset()
+
+    def reset(self):
+        # an empty file
+        self.data['global'] = {}
+        self.data['sections'] = {}
+        self.records = RecordList()
+        # the records with errors, in file order
+        self.error_records = []
+        # (section, key): records and section: records with a section line, in order
+        self.keys = {}
+        self.sections = {}
+
+    def parse(self, text):
+        '''Parse the text of logical lines into records.
+        @param text The text.
+        @returns Returns the list of (record, count, advance) for each logical line.
+        '''
+        out = []
+        interned = self.data.get('intern')
+        for line, count in logical_lines(text):
+            events = self.scan(line)
+            headers = []
+            key_lines = []
+            errors = []
+            section = INHERIT
+            while(True):
+                try:
+                    event = next(events)
+                except StopIteration as stop:
+                    line_no = stop.value
+                    break
+                if(isinstance(event, dict)):
+                    errors.append(event)
+                elif(event[1] is None):
+                    section = intern(event[0]) if(interned) else event[0]
+                    headers.append(section)
+                elif(interned):
+                    key_lines.append((section, intern(event[1]),
+                                      [intern_value(v) for v in event[2]]))
+                else:
+                    key_lines.append((section, event[1], event[2]))
+            out.append((Record(line, headers, key_lines, errors), count, line_no - 1))
+        return out
+
+    def detach(self, record):
+        for name in record.headers:
+            self.touch_section(name)
+            self.sections[name].remove(record)
+        for key in record.values:
+            self.touch_key(key)
+            self.keys[key].remove(record)
+        self.touch_order(record.order)
+
+    def attach(self, record, section):
+        record.section = section
+        values = {}
+        for name, key, line_values in record.events:
+            key = (section if(name is INHERIT) else name, key)
+            current = values.get(key)
+            if(current is None):
+                values[key] = list(line_values)
+            else:
+                current.extend(line_values)
+        record.values = values
+        for name in record.headers:
+            self.touch_section(name)
+            insert(self.sections.setdefault(name, []), record)
+        for key in values:
+            self.touch_key(key)
+            insert(self.keys.setdefault(key, []), record)
+        self.touch_order(record.order)
+
+    def touch_section(self, name):
+        # note a changed section and the place of its first line before the change
+        # Note: A name is touched before any of its records is detached or attached,
+        # so the place is taken from records that have not been changed yet.
+        if(name not in self.changed_sections):
+            records = self.sections.get(name)
+            self.changed_sections[name] = self.section_rank(name, records[0]) \
+                if(records) else None
+
+    def touch_key(self, key):
+        if(key not in self.changed_keys):
+            records = self.keys.get(key)
+            self.changed_keys[key] = self.key_rank(key, records[0]) if(records) else None
+
+    def touch_order(self, order):
+        if(self.span is None):
+            self.span = [order, order]
+        elif(order < self.span[0]):
+            self.span[0] = order
+        elif(order > self.span[1]):
+            self.span[1] = order
+
+    def section_rank(self, name, record=None):
+        # the place of a section's first line
+        record = record or self.sections[name][0]
+        return record.order, record.headers.index(name)
+
+    def key_rank(self, key, record=None):
+        # the place of a key's first line
+        record = record or self.keys[key][0]
+        return record.order, list(record.values).index(key)
+
+    def in_order(self, changed, owners, rank):
+        '''Check if the changed sections or keys of a dictionary keep their places.
+        The other sections or keys all have their first records outside of the changed span.
+        @param changed A dictionary of name: the place, (order, position), of the name's
+        first line before the change, None if it had none.
+        @param owners A dictionary of name: records.
+        @param rank A function, rank(name), which returns the current place of the name's first line.
+        @returns Returns True if the dictionary order is unchanged.
+        '''
+        lo, hi = self.span
+        for name, old in changed.items():
+            if(old is None):
+                return False
+            new = owners[name][0].order
+            if(new != old[0] and not (lo <= old[0] <= hi and lo <= new <= hi)):
+                return False
+        before = sorted(changed, key=changed.get)
+        after = sorted(changed, key=rank)
+        return before == after
+
+    def update(self):
+        # patch the data for the changed sections and keys
+        # Note: The sections and keys are touched in file order when a dictionary
+        # is built from empty, for example by the first parse, so it needs no reordering.
+        sections = self.data['sections']
+        empty = not sections
+        kept = {}
+        for name in self.changed_sections:
+            if(self.sections.get(name)):
+                if(name not in sections):
+                    sections[name] = {}
+                kept[name] = self.changed_sections[name]
+            else:
+                self.sections.pop(name, None)
+                sections.pop(name, None)
+        if(kept and not empty and not self.in_order(kept, self.sections, self.section_rank)):
+            reorder(sections, self.section_rank)
+        changed = {}
+        for key, old in self.changed_keys.items():
+            section = self.data['global'] if(key[0] is None) else sections.get(key[0])
+            records = self.keys.get(key)
+            if(not records):
+                self.keys.pop(key, None)
+                if(section is not None):
+                    section.pop(key[1], None)
+                continue
+            if(key[0] not in changed):
+                # None if the section was empty
+                changed[key[0]] = {} if(section) else None
+            keys = changed[key[0]]
+            if(keys is not None):
+                keys[key] = old
+            values = []
+            for record in records:
+                values.extend(record.values[key])
+            section[key[1]] = values
+        for name, keys in changed.items():
+            if(keys is not None and not self.in_order(keys, self.keys, self.key_rank)):
+                reorder(self.data['global'] if(name is None) else sections[name],
+                        lambda key: self.key_rank((name, key)))
+
+    def edit(self, start_line, end_line, text):
+        '''Replace physical lines and parse again only the changed logical lines.
+        If the edit fails after the new lines are parsed, the index is built again
+        from the text before the edit, so that it is never left half changed.
+        @param start_line The first line to replace, counting from 1.
+        @param end_line The last line to replace, start_line - 1 to insert before start_line.
+        @param text The new lines, with their line ends.
+        @returns Returns the number of physical lines parsed.
+        '''
+        records = self.records
+        total = records.lines
+        if(not (1 <= start_line <= total + 1 and start_line - 1 <= end_line <= total)):
+            raise Exception('apply_edit: invalid line range', (start_line, end_line))
+        # the records of the first and last replaced lines and the lines before them
+        first, before = records.find(start_line)
+        if(end_line >= start_line):
+            last, last_before = records.find(end_line)
+        else:
+            last, last_before = first, before
+        region = text
+        if(end_line < start_line and before == start_line - 1):
+            # an insertion between records
+            stop = first
+        else:
+            region = ''.join(split_lines(records.get(first).text)[:start_line - 1 - before]) + \
+                region
+            region += ''.join(split_lines(records.get(last).text)[end_line - last_before:])
+            stop = last + 1
+        # join the neighboring records that are now part of the same logical line
+        # or of the same carriage return, line feed line end
+        while(True):
+            following = region if(region or stop == records.length) \
+                else records.get(stop).text
+            if(first):
+                previous = records.get(first - 1).text
+                if(previous[-1] not in '\r\n' or '/' in last_line(previous) or
+                   (previous[-1] == '\r' and following[:1] == '\n')):
+                    first -= 1
+                    region = previous + region
+                    continue
+            if(region and stop < records.length):
+                following = records.get(stop).text
+                if(region[-1] not in '\r\n' or '/' in last_line(region) or
+                   (region[-1] == '\r' and following[0] == '\n')):
+                    region += following
+                    stop += 1
+                    continue
+            break
+        old = list(islice(records.iterate(first), stop - first))
+        new = self.parse(region)
+        try:
+            self.replace(first, stop, old, new)
+        except Exception:
+            # the records are replaced last, so the records are still those before the edit
+            self.rebuild(''.join(record.text for record in records.iterate(0)))
+            raise
+        return sum(item[1] for item in new)
+
+    def replace(self, first, stop, old, new):
+        # replace the old records first to stop - 1 with the new parsed records
+        records = self.records
+        self.changed_sections = {}
+        self.changed_keys = {}
+        self.span = None
+        for record in old:
+            self.detach(record)
+        # number the new records between their neighbors
+        lo = records.get(first - 1).order if(first) else 0
+        hi = records.get(stop).order if(stop < records.length) else None
+        parts = len(new) + 1
+        if(hi is None):
+            # after the last record
+            hi = lo + SPACING * parts
+        for i, item in enumerate(new):
+            if(hi - lo >= parts):
+                item[0].order = lo + (hi - lo) * (i + 1) // parts
+            else:
+                item[0].order = lo + Fraction(hi - lo, parts) * (i + 1)
+        section = records.get(first - 1).out() if(first) else None
+        old_out = old[-1].out() if(old) else section
+        for record, count, advance in new:
+            self.attach(record, section)
+            section = record.out()
+        if(section != old_out):
+            # move the following key lines to the new section
+            for record in records.iterate(stop):
+                self.detach(record)
+                self.attach(record, section)
+                if(record.headers):
+                    break
+        # replace the records with errors, those between the neighbors
+        errors = self.error_records
+        begin = bound(errors, lo, upper=True)
+        end = bound(errors, hi) if(stop < records.length) else len(errors)
+        errors[begin:end] = [item[0] for item in new if(item[0].errors)]
+        if(self.span is not None):
+            self.update()
+        records.splice(first, stop, new)
+
+    def rebuild(self, text):
+        # build the index again from the text
+        self.reset()
+        if(text):
+            self.replace(0, 0, [], self.parse(text))
+
+    def error_reports(self):
+        '''Get the error reports with the line numbers of the INI file.
+        @returns Returns the list of error reports in file order.
+        '''
+        reports = []
+        for record in self.error_records:
+            base = self.records.steps_before(record)
+            for error in record.errors:
+                reports.append(dict(error, line=error['line'] + base))
+        return reports
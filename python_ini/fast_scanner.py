@@ -0,0 +1,367 @@
+''' @file python_ini/fast_scanner.py
+@brief The line scanner for the IniFile "fast" engine.
+
+The scanner classifies the INI file one physical line at a time with
+regular expressions which follow the productions in grammar.abnf.
+It builds exactly the same section/key/value data and error reports as the
+apg-py parser, using the same data helpers as the AST callbacks.
+
+Any line that the scanner cannot classify with certainty is handed back to the
+apg-py parser. These are lines with characters outside of the grammar's
+character set, lines where a forward slash(/) could begin a line continuation and
+lines with escaped characters that would be reported as errors.
+Since a line continuation may run on to any number of following lines,
+the handed back lines are extended until a line without a forward slash is found.
+'''
+import re
+import python_ini.ast_callbacks as acb
+
+# name                = 1*(%d97-122 / %d65-90 / %d48-57 / %d33 / %d36-38 / %d40-43
+#                     / %d45-46 / %d60 / %d62-64 / %d94-95 / %d123-126)
+NAME = r'[a-zA-Z0-9!$%&()*+\-.<>?@^_{|}~]+'
+# escaped - the UDT hex digits accept [0-9a-fA-H], see parser_callbacks.hex_digit()
+ESCAPED = r'\\(?:[\\/"#\',:;=btnr]|U[0-9a-fA-H]{8}|u[0-9a-fA-H]{4}|x[0-9a-fA-H]{2})'
+
+LINE = re.compile(r'([^\r\n]*)(\r\n|\n|\r)?')
+LINE_BYTES = re.compile(rb'([^\r\n]*)(\r\n|\n|\r)?')
+INVALID = re.compile(r'[^\t -~]')
+BLANK = re.compile(r'[ \t]*(?:[;#].*)?')
+SECTION = re.compile(r'\[[ \t]*(' + NAME + r')[ \t]*\][ \t]*(?:[;#].*)?')
+KEY_NAME = re.compile(NAME)
+WS = re.compile(r'[ \t]*')
+INT = re.compile(r'[+-]?[0-9]+')
+FLOAT = re.compile(
+    r'[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?')
+BOOLEAN = re.compile(r'(null|void|none)|(true|yes|on)|(false|no|off)', re.I)
+D_QUOTED = re.compile(r'"((?:[ !#-\[\]-~]|' + ESCAPED + r')+)"')
+S_QUOTED = re.compile(r"'((?:[ -&(-\[\]-~]|" + ESCAPED + r')+)' + "'")
+STRING = re.compile(r'(?:[!$-&(-+\-.0-9<>-\[\]-~]|' + ESCAPED + r')+')
+UNICODE = re.compile(r'\\(?:U([0-9a-fA-H]{8})|u([0-9a-fA-H]{4})|.)')
+
+
+class Fallback(Exception):
+    '''Raised when a line must be handed back to the apg-py parser.'''
+    pass
+
+
+def check_escapes(text):
+    # the surrogate and range errors of the u_unicode4 and u_unicode8 UDTs
+    for m in UNICODE.finditer(text):
+        if(m.group(1)):
+            c = acb.hex_value(m.group(1))
+            if((c >= 0xd800 and c <= 0xdfff) or c > 0x10ffff):
+                raise Fallback()
+        elif(m.group(2)):
+            c = acb.hex_value(m.group(2))
+            if(c >= 0xd800 and c <= 0xdfff):
+                raise Fallback()
+
+
+def string(text, lazy):
+    if('\\' not in text):
+        return text
+    check_escapes(text)
+    if(lazy):
+        return acb.LazyValue(acb.string_eval, text)
+    return acb.string_eval(text)
+
+
+def owsp(line, index):
+    index = WS.match(line, index).end()
+    if(index < len(line) and line[index] == '/'):
+        # line-continue
+        raise Fallback()
+    return index
+
+
+def delimiter(line, index, chars):
+    # key-delim   = (owsp (%d61 / %d58) owsp) / wsp
+    # value-delim = (owsp %d44 owsp) / wsp
+    i = owsp(line, index)
+    if(i < len(line) and line[i] in chars):
+        return owsp(line, i + 1)
+    if(i > index):
+        return i
+    return None
+
+
+def number_end(line, index):
+    # &(%d44 / wsp / digit-line-end)
+    if(index == len(line)):
+        return True
+    c = line[index]
+    if(c == ',' or c == ' ' or c == '\t'):
+        return True
+    if(c == '/'):
+        raise Fallback()
+    return False
+
+
+def value(line, index, lazy):
+    m = INT.match(line, index)
+    if(m and number_end(line, m.end())):
+        return int(m.group()), m.end()
+    m = FLOAT.match(line, index)
+    if(m and number_end(line, m.end())):
+        return float(m.group()), m.end()
+    m = BOOLEAN.match(line, index)
+    if(m):
+        if(m.group(1)):
+            return None, m.end()
+        return bool(m.group(2)), m.end()
+    m = D_QUOTED.match(line, index)
+    if(m is None):
+        m = S_QUOTED.match(line, index)
+    if(m):
+        return string(m.group(1), lazy), m.end()
+    m = STRING.match(line, index)
+    if(m):
+        return string(m.group(), lazy), m.end()
+    return None
+
+
+def value_line(line, lazy=False):
+    '''Match a good-value line.
+    @param line The line, without the line end.
+    @param lazy If True, strings with escaped characters are returned
+    as acb.LazyValue objects.
+    @returns Returns the key name and list of values or None if not a good value line.
+    Raises Fallback if the line must be parsed by the apg-py parser.
+    '''
+    m = KEY_NAME.match(line)
+    if(m is None):
+        return None
+    key = m.group()
+    values = []
+    index = delimiter(line, m.end(), '=:')
+    if(index is None):
+        index = m.end()
+    else:
+        v = value(line, index, lazy)
+        while(v):
+            values.append(v[0])
+            index = v[1]
+            i = delimiter(line, index, ',')
+            if(i is None):
+                break
+            v = value(line, i, lazy)
+    index = owsp(line, index)
+    if(index < len(line) and line[index] != ';' and line[index] != '#'):
+        return None
+    return key, values
+
+
+def scan_line(line, terminated, line_no, errors, lazy=False):
+    '''Scan a single physical line.
+    @param line The line, without the line end.
+    @param terminated True if the line has a line end, False if it ends at the end of file.
+    @param line_no The parser's line number at the beginning of the line.
+    @param errors The list to append the line's error report to, if any.
+    @param lazy If True, strings with escaped characters are returned undecoded, see value_line().
+    @returns Returns
+        - None if the line must be parsed by the apg-py parser
+        - () for blank and error lines
+        - (section-name,) for section lines
+        - (key-name, values) for key/value lines
+    '''
+    if(INVALID.search(line)):
+        return None
+    if(BLANK.fullmatch(line)):
+        return ()
+    # Note: The error line numbers mimic the line counting of the parser callbacks.
+    # The line-end callback only counts matched line ends, not the end of file.
+    first = line[0]
+    if(first == ' ' or first == '\t'):
+        if('/' in line):
+            return None
+        msg = 'invalid blank line, only white space and comments allowed'
+        errors.append({'line': line_no + terminated, 'message': msg})
+        return ()
+    if(first == '['):
+        m = SECTION.fullmatch(line)
+        if(m):
+            return (m.group(1),)
+        if('/' in line):
+            return None
+        errors.append({'line': line_no + terminated,
+                       'message': 'bad section definition'})
+        return ()
+    try:
+        result = value_line(line, lazy)
+    except Fallback:
+        return None
+    if(result is None):
+        if('/' in line or '\\' in line):
+            return None
+        errors.append({'line': line_no + terminated - 1,
+                       'message': 'bad key/value definition'})
+        return ()
+    return result
+
+
+def scan(input, data, errors, fallback, lazy=False):
+    '''Scan the INI file.
+    @param input The INI file as a string or a bytes-like object (bytes, memoryview, mmap).
+    Bytes-like input is decoded one line at a time, never as a whole.
+    @param data The IniFile data, see ast_callbacks.py.
+    @param errors The list to append error reports to.
+    @param fallback A function, fallback(begin, length, line_no), which parses
+    the lines input[begin:begin + length] with the apg-py parser
+    and returns the parser's line number at the end of them.
+    @param lazy If True, strings with escaped characters are recorded undecoded, see IniFile(lazy=True).
+    '''
+    line_no = 1
+    # the physical line number, for the schema error reports
+    physical = 0
+    index = 0
+    end = len(input)
+    begin = None
+    is_str = isinstance(input, str)
+    lines = LINE if(is_str) else LINE_BYTES
+    while(index < end):
+        m = lines.match(input, index)
+        # latin-1 keeps the string and buffer indexes the same
+        line = m.group(1) if(is_str) else str(m.group(1), 'latin-1')
+        index = m.end()
+        physical += 1
+        if(begin is None):
+            result = scan_line(line, m.group(2) is not None, line_no, errors, lazy)
+            if(result is not None):
+                data['line'] = physical
+                if(len(result) == 2):
+                    acb.open_key(data, result[0])
+                    for v in result[1]:
+                        acb.add_value(data, v)
+                elif(result):
+                    acb.open_section(data, result[0])
+                if(m.group(2) is not None):
+                    line_no += 1
+                continue
+            begin = m.start()
+        if(index < end and '/' in line):
+            # possible line continuation
+            continue
+        line_no = fallback(begin, index - begin, line_no)
+        begin = None
+
+
+def split_lines(pieces):
+    '''Split the INI file into physical lines.
+    @param pieces An iterable of strings or bytes-like objects of any size
+    which together are the INI file. Bytes are decoded as latin-1.
+    @returns Yields a (line, line-end) tuple for each line.
+    The line-end is None for a last line that ends at the end of file.
+    '''
+    parts = []
+    for piece in pieces:
+        if(not isinstance(piece, str)):
+            piece = str(piece, 'latin-1')
+        if('\n' not in piece and '\r' not in piece):
+            parts.append(piece)
+            continue
+        parts.append(piece)
+        text = ''.join(parts)
+        index = 0
+        while(True):
+            m = LINE.match(text, index)
+            if(m.group(2) is None or (m.end() == len(text) and m.group(2) == '\r')):
+                # incomplete line or a carriage return that may be followed by a line feed
+                break
+            yield m.group(1), m.group(2)
+            index = m.end()
+        parts = [text[index:]]
+    text = ''.join(parts)
+    index = 0
+    while(index < len(text)):
+        m = LINE.match(text, index)
+        yield m.group(1), m.group(2)
+        index = m.end()
+
+
+def scan_events(pieces, fallback, classify=True, lazy=False):
+    '''Scan the INI file one line at a time.
+    Only the current line, or the lines of a possible line continuation,
+    are held in memory.
+    @param pieces An iterable of strings or bytes-like objects, see split_lines().
+    @param fallback A function, fallback(text, line_no, data, errors), which parses
+    the lines in text with the apg-py parser, translates them into data
+    and returns the parser's line number at the end of them.
+    @param classify If False, all lines are parsed with the apg-py parser.
+    Since a line can only be continued by a forward slash(/), the lines are
+    still parsed one logical line at a time.
+    @param lazy If True, strings with escaped characters are undecoded, see IniFile(lazy=True).
+    @returns Yields
+        - (section, key, values, line_no) for each key/value line,
+            section is None for global keys and values is the list of values on the line
+        - (section, None, [], line_no) for each section line
+        - {'line': line_no, 'message': message} for each error
+    The generator returns (the StopIteration value) the parser's line number
+    at the end of the input.
+    '''
+    errors = []
+    section = None
+    line_no = 1
+    group = None
+    group_line_no = None
+    for line, end in split_lines(pieces):
+        if(group is None):
+            result = scan_line(line, end is not None, line_no, errors, lazy) \
+                if(classify) else None
+            if(result is not None):
+                if(errors):
+                    yield errors.pop()
+                elif(len(result) == 2):
+                    yield (section, result[0], result[1], line_no)
+                elif(result):
+                    section = result[0]
+                    yield (section, None, [], line_no)
+                if(end is not None):
+                    line_no += 1
+                continue
+            group = []
+            group_line_no = line_no
+        group.append(line + end if(end) else line)
+        if(end and '/' in line):
+            # possible line continuation
+            continue
+        events, section, line_no = fallback_events(
+            fallback, ''.join(group), section, line_no, group_line_no, lazy)
+        group = None
+        yield from events
+    if(group):
+        events, section, line_no = fallback_events(
+            fallback, ''.join(group), section, line_no, group_line_no, lazy)
+        yield from events
+    return line_no
+
+
+def apply_events(events, data, errors):
+    '''Add the events from scan_events() to the IniFile data.
+    @param events The events.
+    @param data The IniFile data, see ast_callbacks.py.
+    @param errors The list to append error reports to.
+    '''
+    for event in events:
+        if(isinstance(event, dict)):
+            errors.append(event)
+        elif(event[1] is None):
+            acb.open_section(data, event[0])
+        else:
+            data['current_section'] = event[0]
+            acb.open_key(data, event[1])
+            for v in event[2]:
+                acb.add_value(data, v)
+
+
+def fallback_events(fallback, text, section, line_no, group_line_no, lazy):
+    errors = []
+    data = {}
+    data['lazy'] = lazy
+    data['current_section'] = section
+    data['current_key'] = None
+    data['events'] = []
+    line_no = fallback(text, line_no, data, errors)
+    events = errors
+    for event in data['events']:
+        events.append((event[0], event[1], event[2], group_line_no))
+    return events, data['current_section'], line_no
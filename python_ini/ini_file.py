@@ -7,26 +7,117 @@
 import sys
 import os
 import copy
+import time
+import marshal
+import asyncio
+import functools
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from mmap import mmap as MemoryMap, ACCESS_READ
 # add the current working directory to the path
 # DO NOT MOVE THE FOLLOWING STATEMENT
 # if using autopep8 formatter, for example, set argument '--ignore=E402'
 sys.path.append(os.getcwd())
-from apg_py.lib import utilities as utils
-from apg_py.lib.parser import Parser
-from apg_py.lib.trace import Trace
-from apg_py.lib.ast import Ast
-import python_ini.grammar as grammar
-import python_ini.parser_callbacks as pcb
-import python_ini.ast_callbacks as acb
+from python_ini.pipeline import get_pipeline
+import python_ini.fast_scanner as fast_scanner
+import python_ini.snapshot as snapshot
+from python_ini.edit_index import EditIndex
+from python_ini.ast_callbacks import LazyValue, intern_value
+from python_ini.parsed_ini import ParsedIni, extract_values, check_path_sep
 
 # Note: The SABNF syntax for the ini file parser is in grammar.abnf.
 # The grammar object, grammar.py was generated with (assuming PyPI installation of apg-py)
 # python3 apg-py -i python_ini/grammar.abnf
 
 
+def input_buffer(input):
+    '''Convert the INI file input to the parser's input buffer.
+    The apg-py parser only needs an indexable sequence of character codes.
+    Since the grammar accepts only ASCII characters, the buffer is normally
+    the ASCII bytes of the input, one byte per character.
+    Strings with non-ASCII characters (which the parser will reject)
+    are converted to an array of 32-bit character codes.
+    @param input The INI file as a string or bytes-like object.
+    @returns Returns the input buffer.
+    '''
+    if(isinstance(input, str)):
+        if(input.isascii()):
+            return input.encode('ascii')
+        return array('I', map(ord, input))
+    return input
+
+
+def read_chunks(fhandle, chunk_size):
+    '''Read an open file in chunks.
+    @param fhandle The file handle, opened in text or binary mode.
+    @param chunk_size The number of characters (or bytes) to read at a time.
+    @returns Yields the chunks.
+    '''
+    while(True):
+        chunk = fhandle.read(chunk_size)
+        if(not chunk):
+            return
+        yield chunk
+
+
+def parse_file(fname, values, engine, fstr=None, schema=None, mmap=False, intern=False):
+    '''The parse_many() and aparse() worker, run in a pool process or thread.
+    @param fname The name of the INI file to parse.
+    @param values The IniFile values mode.
+    @param engine The IniFile parsing engine.
+    @param fstr If fname is None, the INI file as a string or bytes.
+    @param schema The IniFile schema.
+    @param mmap If True, the file is memory-mapped, see IniFile.parse().
+    @param intern If True, the names and short values are interned, see IniFile().
+    @returns Returns a tuple of the IniFile._export() data and the parse time in seconds.
+    '''
+    start = time.perf_counter()
+    ini = IniFile(values, engine=engine, schema=schema, intern=intern)
+    ini.parse(fname, fstr=fstr, mmap=mmap)
+    return ini._export(), time.perf_counter() - start
+
+
+def intern_data(data):
+    '''Intern the names and short values of parsed data received from a pool process.
+    The pickled results of a ProcessPoolExecutor are not interned, see IniFile(intern=True).
+    @param data The IniFile._export() data.
+    @returns Returns a copy of the data with the strings interned.
+    '''
+    def keys(names):
+        return {sys.intern(key): [intern_value(value) for value in values]
+                for key, values in names.items()}
+    return (keys(data[0]), {sys.intern(name): keys(names) for name, names in data[1].items()},
+            data[2])
+
+
+# the aparse() parses of files in progress, (loop, executor, fname, options): [future, waiters]
+IN_FLIGHT = {}
+
+
+def error_display(errors):
+    '''Convert the error reports to the errors display.
+    @param errors The list of error reports.
+    @returns Returns the display or None if there are no errors.
+    '''
+    if(not len(errors)):
+        return None
+    msg = ''
+    for error in errors:
+        msg += '{'
+        count = 0
+        for key, value in error.items():
+            if(count > 0):
+                msg += ', '
+            msg += str(key) + ': ' + str(value)
+            count += 1
+        msg += '}\n'
+    return msg
+
+
 class IniFile:
 
-    def __init__(self, values='s', debug=False):
+    def __init__(self, values='s', debug=False, engine='apg', lazy=False, cache=None,
+                 file_cache=None, path_sep='/', schema=None, editable=False, intern=False):
         '''Ini file parser constructor.
         @param values Determines whether the "getter" functions", get_values() and get_section_values(),
         return a single value or a list of one or more values.
@@ -37,94 +128,485 @@ class IniFile:
                 If the same key appears more than once within a given section,
                 the value(s) are appended to the previous list.
         @param debug If True, a trace of the parse is printed to stdout.
+        @param engine Selects the parsing engine.
+            - 'apg' (default) The full INI file is parsed with the apg-py parser
+                generated from grammar.abnf.
+            - 'fast' The INI file is scanned line by line with a hand-written scanner
+                (see fast_scanner.py) which falls back to the apg-py parser only
+                for the lines it cannot classify. The results and error reports
+                are identical to the 'apg' engine.
+        @param lazy If True, the parse records only the source text of string values
+        with escaped characters. The escaped characters are evaluated
+        on the first access with get_values() or get_section_values()
+        and the result is kept. Syntax errors, including bad Unicode escapes,
+        are still reported by the parse.
+        Useful for large files where only a few of the keys are read.
+        @param cache If not None, a python_ini.cache.ParseCache object.
+        parse() first looks up the parsed data by a hash of the INI file content
+        and parses only if it is not found. Input from a file handle is not cached.
+        Note that lazy values are decoded before the data is cached.
+        @param file_cache If not None, a python_ini.cache.FileCache object.
+        parse(fname=...) neither reads nor parses a file which is unchanged,
+        as determined by os.stat(), since it was last parsed.
+        Note that lazy values are decoded before the data is cached.
+        @param path_sep The separator of section and key names in the paths
+        of ini[path], get() and get_many(). For example, with the default,
+        "SECTION.1.1/number" is the key "number" in the section "SECTION.1.1".
+        A path without a section name is a global key.
+        The separator must have a character that is not allowed in names, such as '/' or ':',
+        so that no global key has the same path as a section's key.
+        @param schema If not None, a python_ini.schema.Schema object.
+        The sections, keys and values are validated, and numbers converted,
+        as they are translated. Schema errors are reported in the errors
+        along with the syntax errors, sorted by line number.
+        Sections, keys and values with schema errors are not kept.
+        With a schema, file handle input is read whole before parsing
+        and the cache and file_cache are not used.
+        @param editable If True, parse() keeps the INI file text, one record for each
+        logical line, and the parse results of each record (see edit_index.py),
+        so that apply_edit() can parse again only the lines that an edit changes.
+        The input is read whole and the cache and file_cache are not used.
+        Not supported with a schema.
+        @param intern If True, the section and key names and the string values of up to
+        64 characters (ast_callbacks.INTERN_MAX) are interned with sys.intern(),
+        so that the names and common values repeated in many parsed files,
+        or many times in one file, are kept as a single string.
+        The strings loaded from the cache and file_cache stay interned.
         '''
         if(not (values == 'm' or values == 's')):
             msg = 'values must be "s" (single-valued) or "m" (multi-valued)'
             raise Exception(msg, values)
+        if(not (engine == 'apg' or engine == 'fast')):
+            msg = 'engine must be "apg" (parser) or "fast" (line scanner)'
+            raise Exception(msg, engine)
+        check_path_sep(path_sep)
+        if(editable and schema is not None):
+            raise Exception('editable is not supported with a schema')
+        self.__path_sep = path_sep
+        self.__engine = engine
+        self.__lazy = bool(lazy)
+        self.__cache = None if(schema or editable) else cache
+        self.__file_cache = None if(schema or editable) else file_cache
+        self.__editable = bool(editable)
+        # the line index of apply_edit(), built by parse() if editable
+        self.__edits = None
+        # the read-only views of the key and section names
+        # and the path index, built on first use
+        self.__views = {}
+        self.__index = None
         self.errors = None
-        self.__parser = Parser(grammar)
-        if(debug):
-            Trace(self.__parser, mode='xc')
-        self.__parser.add_callbacks({'line-end': pcb.line_end})
-        self.__parser.add_callbacks({'bad-section-line': pcb.bad_section_line})
-        self.__parser.add_callbacks({'bad-value-line': pcb.bad_value_line})
-        self.__parser.add_callbacks({'bad-blank-line': pcb.bad_blank_line})
-        self.__parser.add_callbacks({'u_unicode8': pcb.unicode8})
-        self.__parser.add_callbacks({'u_unicode4': pcb.unicode4})
-        self.__parser.add_callbacks({'u_hexadecimal': pcb.hexadecimal})
-        self.__parser.add_callbacks({'u_escaped-error': pcb.escaped_error})
-        self.__ast = Ast(self.__parser)
-        self.__ast.add_callback('section-name', acb.section_name)
-        self.__ast.add_callback('key-name', acb.key_name)
-        self.__ast.add_callback('value', acb.value)
-        self.__ast.add_callback('d-quoted-value', acb.d_value)
-        self.__ast.add_callback('s-quoted-value', acb.s_value)
-        self.__ast.add_callback('string', acb.string_value)
-        self.__ast.add_callback('true', acb.true_value)
-        self.__ast.add_callback('false', acb.false_value)
-        self.__ast.add_callback('null', acb.null_value)
-        self.__ast.add_callback('int', acb.int_value)
-        self.__ast.add_callback('float', acb.float_value)
+        # the prepared parser and AST are shared by all IniFile objects
+        self.__pipeline = get_pipeline(debug)
         self.__data = {}
         self.__data['values'] = values
+        self.__data['lazy'] = self.__lazy
+        self.__data['schema'] = schema
+        self.__data['intern'] = bool(intern)
         self.__data['current_section'] = None
         self.__data['current_key'] = None
         self.__data['global'] = {}
         self.__data['sections'] = {}
 
-    def parse(self, fname=None, fhandle=None, fstr=None):
+    def parse(self, fname=None, fhandle=None, fstr=None, mmap=False,
+              chunk_size=65536):
         '''Parse the input INI file.
         Parses the ini file, input as a file name, file handle or string.
         At least one of fname, fhandle or fstr must be supplied.
         If more than one, the first non-None value of fname, fhandle or fstr in that
         order is accepted. If none are supplied an Exception is raised.
         @param fname The name of the ini file to parse.
-        @param fhandle A handle to an open ini file.
-        @param fstr The ini file as a string.
+        @param fhandle A handle to an open ini file, opened in text or binary mode.
+        The file is read in chunks and parsed one (logical) line at a time,
+        so that only a chunk and the longest line are held in memory.
+        This is suitable for pipes and sockets.
+        @param fstr The ini file as a string or bytes.
+        @param mmap If True, the file fname is memory-mapped read only
+        and parsed directly from the mapped bytes rather than read into memory.
+        Only the section and key names and the values are copied from the mapping.
+        @param chunk_size The number of characters (or bytes) read at a time from fhandle.
         '''
         self.errors = None
         if(fname):
-            with open(fname, 'r') as fd:
-                input = fd.read()
+            if(self.__file_cache is None):
+                self.__parse_file(fname, mmap)
+                return
+            stamp = self.__file_cache.stamp(fname)
+            data = self.__file_cache.get(fname, stamp)
+            if(data is None):
+                self.__parse_file(fname, mmap)
+                self.__file_cache.put(fname, stamp, self._export())
+            else:
+                self._restore(data)
+            return
         elif(fhandle):
-            input = fhandle.read()
+            self.__parse_input(read_chunks(fhandle, chunk_size))
+            return
         elif(fstr):
             input = fstr
         else:
             msg = 'no input supplied, must supply fname, fhandle or fstr'
             self.errors = msg
             raise Exception(msg)
+        self.__parse_cached(input)
+
+    async def aparse(self, fname=None, fhandle=None, fstr=None, executor=None, mmap=False,
+                     chunk_size=65536):
+        '''Parse the input INI file without blocking the asyncio event loop.
+        The file is read and parsed in an executor. The input arguments are the same as for parse().
+        Concurrent aparse() calls for the same file name, by IniFile objects with the same
+        values, engine, schema and intern options and the same executor, share a single parse.
+        Each object gets its own copy of the parsed data.
+        For example, in a coroutine,
+        <pre>
+        await ini.aparse('server.ini')
+        </pre>
+        @param executor The concurrent.futures executor to run the parse in,
+        None for the event loop's default thread pool.
+        A ThreadPoolExecutor keeps the event loop responsive. A ProcessPoolExecutor also
+        runs parses in parallel, but does not accept fhandle or IniFile(editable=True).
+        The file_cache is used for file names. The cache is used only for fstr input
+        parsed in a thread.
+        @param mmap See parse().
+        @param chunk_size See parse().
+        '''
+        loop = asyncio.get_running_loop()
+        process = isinstance(executor, ProcessPoolExecutor)
+        if(process and (fhandle or self.__editable)):
+            raise Exception('aparse: a process executor cannot parse a file handle or edit')
+        values = self.__data['values']
+        schema = self.__data['schema']
+        interned = self.__data['intern']
+        if(fname and not self.__editable):
+            stamp = None
+            if(self.__file_cache is not None):
+                stamp = await loop.run_in_executor(None, self.__file_cache.stamp, fname)
+                data = self.__file_cache.get(fname, stamp)
+                if(data is not None):
+                    self._restore(data)
+                    return
+            key = (loop, executor, os.path.abspath(fname), values, self.__engine, schema,
+                   interned)
+            shared = IN_FLIGHT.get(key)
+            owner = shared is None
+            if(owner):
+                future = loop.run_in_executor(executor, parse_file, fname, values,
+                                              self.__engine, None, schema, mmap, interned)
+                shared = IN_FLIGHT[key] = [future, 0]
+                future.add_done_callback(lambda future: IN_FLIGHT.pop(key, None))
+            else:
+                shared[1] += 1
+            # shielded, so that a cancelled caller does not cancel the others' parse
+            data = (await asyncio.shield(shared[0]))[0]
+            if(process and interned):
+                data = intern_data(data)
+            elif(not owner or shared[1]):
+                # the parsed data is shared, take a copy
+                data = marshal.loads(marshal.dumps(data))
+            self._restore(data)
+            if(stamp is not None):
+                self.__file_cache.put(fname, stamp, self._export())
+        elif(process):
+            data = await loop.run_in_executor(
+                executor, parse_file, None, values, self.__engine, fstr, schema, False, interned)
+            self._restore(intern_data(data[0]) if(interned) else data[0])
+        else:
+            await loop.run_in_executor(executor, functools.partial(
+                self.parse, fname, fhandle, fstr, mmap, chunk_size))
+
+    def __parse_file(self, fname, mmap):
+        with open(fname, 'rb') as fd:
+            if(mmap and os.fstat(fd.fileno()).st_size):
+                with MemoryMap(fd.fileno(), 0, access=ACCESS_READ) as input:
+                    self.__parse_cached(input)
+                return
+            input = fd.read()
+        self.__parse_cached(input)
+
+    def __parse_cached(self, input):
+        if(self.__cache is None):
+            self.__parse_input(input)
+            return
+        key = self.__cache.key(input)
+        data = self.__cache.get(key)
+        if(data is None):
+            self.__parse_input(input)
+            self.__cache.put(key, self._export())
+        else:
+            self._restore(data)
+
+    def __parse_input(self, input):
+        errors = []
+        self.__views = {}
+        self.__index = None
+        self.__edits = None
+        if(self.__editable):
+            self.__parse_editable(input)
+            return
+        self.__data['current_section'] = None
+        self.__data['current_key'] = None
+        self.__data['global'] = {}
+        self.__data['sections'] = {}
+        schema = self.__data['schema']
+        if(schema is not None):
+            if(not isinstance(input, (str, bytes, bytearray, memoryview, MemoryMap))):
+                # the schema errors are sorted with the syntax errors, read the whole file
+                chunks = list(input)
+                input = ''.join(chunks) if(chunks and isinstance(chunks[0], str)) \
+                    else b''.join(chunks)
+            self.__data['schema_errors'] = errors
+            self.__data['line_cursor'] = (0, 1)
+            schema.begin(self.__data)
+        if(not isinstance(input, (str, bytes, bytearray, memoryview, MemoryMap))):
+            # an iterable of input chunks
+            events = self.__events(input, self.__engine == 'fast', self.__lazy)
+            fast_scanner.apply_events(events, self.__data, errors)
+        elif(self.__engine == 'fast'):
+            self.__scan(input, errors)
+        else:
+            self.__parse(input_buffer(input), 0, 0, 1, errors)
+        if(schema is not None):
+            # on the same line, the schema errors follow the syntax errors
+            errors.sort(key=lambda error: (error['line'],
+                                           error['message'].startswith('schema: ')))
+        # raise Exception('ini file syntax errors found')
+        self.errors = error_display(errors)
+
+    def __parse_editable(self, input):
+        if(not isinstance(input, (str, bytes, bytearray, memoryview, MemoryMap))):
+            chunks = list(input)
+            input = ''.join(chunks) if(chunks and isinstance(chunks[0], str)) \
+                else b''.join(chunks)
+        if(not isinstance(input, str)):
+            # the same decoding as the fast scanner
+            input = str(input[:], 'latin-1')
+        self.__data['current_section'] = None
+        self.__data['current_key'] = None
+        self.__edits = EditIndex(self.__data, lambda text: self.__events(
+            [text], self.__engine == 'fast', self.__lazy))
+        self.__edits.edit(1, 0, input)
+        self.errors = error_display(self.__edits.error_reports())
+
+    def apply_edit(self, start_line, end_line, new_text):
+        '''Replace lines of the parsed INI file and parse again only the changed lines.
+        Requires IniFile(editable=True) and a previous parse().
+        The edit is the same as replacing the lines in the INI file and parsing it again,
+        but only the logical lines that the edit changes are parsed and only the
+        sections and keys of those lines are updated. A change of section moves the
+        following keys, up to the next section line, to the new section
+        without parsing them again.
+        @param start_line The first line to replace, counting from 1.
+        @param end_line The last line to replace. If end_line is start_line - 1
+        nothing is replaced and new_text is inserted before start_line
+        (after the last line if start_line is the number of lines plus one).
+        @param new_text The new lines, a string or bytes, with their line ends.
+        If the last new line has no line end, it is joined to the line after end_line.
+        An empty string deletes the lines.
+        @returns Returns the number of (physical) lines parsed.
+        Raises Exception if the line numbers are out of range.
+        '''
+        if(self.__edits is None):
+            raise Exception('apply_edit() requires IniFile(editable=True) and parse()')
+        if(not isinstance(new_text, str)):
+            new_text = str(new_text, 'latin-1')
+        self.__views = {}
+        self.__index = None
+        count = self.__edits.edit(start_line, end_line, new_text)
+        if(self.__errors is not None or self.__edits.error_records):
+            # the errors display is built on first use
+            self.__errors_stale = True
+        return count
+
+    def __parse(self, input, begin, length, line_no, errors, data=None):
+        # parse input[begin:begin + length] with the apg-py parser
+        # (length 0 parses to the end of the input)
+        # and translate it into data (default self.__data)
+        # returns the parser's line number at the end of the parsed lines
+        target = self.__data if(data is None) else data
         data = {}
-        data['line_no'] = 1
-        data['errors'] = []
+        data['line_no'] = line_no
+        data['errors'] = errors
         data['skip_escaped_error'] = False
         data['skip_bad_key'] = False
-        result = self.__parser.parse(
-            utils.string_to_tuple(input), user_data=data)
-        if(not result.success):
-            # ABNF syntax is designed so that this should never happen
-            msg = 'internal error - parser failed'
-            msg += '\nuse IniFile(debug=True) for a trace of the parser'
-            raise Exception(msg)
-        if(len(data['errors'])):
-            # display errors
-            msg = ''
-            for error in data['errors']:
-                msg += '{'
-                count = 0
-                for key, value in error.items():
-                    if(count > 0):
-                        msg += ', '
-                    msg += str(key) + ': ' + str(value)
-                    count += 1
-                msg += '}\n'
-            self.errors = msg
-            # raise Exception('ini file syntax errors found')
+        with self.__pipeline.lock:
+            try:
+                result = self.__pipeline.parser.parse(
+                    input, sub_begin=begin, sub_length=length, user_data=data)
+                if(not result.success):
+                    # ABNF syntax is designed so that this should never happen
+                    msg = 'internal error - parser failed'
+                    msg += '\nuse IniFile(debug=True) for a trace of the parser'
+                    raise Exception(msg)
+                self.__pipeline.ast.translate(target)
+            finally:
+                self.__pipeline.release()
+        return data['line_no']
+
+    def __scan(self, input, errors):
+        # the input buffer is only needed if some lines fall back to the parser
+        buffer = []
+
+        def fallback(begin, length, line_no):
+            if(not buffer):
+                buffer.append(input_buffer(input))
+            return self.__parse(buffer[0], begin, length, line_no, errors)
+        fast_scanner.scan(input, self.__data, errors, fallback, self.__lazy)
+
+    def iter_events(self, fname=None, fhandle=None, fstr=None, chunk_size=65536):
+        '''Parse the input INI file incrementally.
+        The INI file is read in chunks and scanned one line at a time with the
+        fast engine (see fast_scanner.py). Each event is yielded as soon as its
+        line is complete and nothing is kept in the IniFile data, so the caller
+        may stop early and files larger than memory can be processed.
+        The getter functions are not affected.
+        The input arguments are the same as for parse().
+        @param chunk_size The number of characters (or bytes) read at a time.
+        @returns Yields
+            - (section, key, values, line_no) for each key/value line.
+                The section is None for global keys.
+                The values are the list of values on the line,
+                an empty list for a "true" flag.
+            - (section, None, [], line_no) for each section line.
+            - {'line': line_no, 'message': message} for each error.
+                The errors are the same as those reported by parse().
+        '''
+        if(fname):
+            with open(fname, 'rb') as fd:
+                yield from self.__events(read_chunks(fd, chunk_size))
+        elif(fhandle):
+            yield from self.__events(read_chunks(fhandle, chunk_size))
+        elif(fstr):
+            yield from self.__events([fstr])
+        else:
+            raise Exception(
+                'no input supplied, must supply fname, fhandle or fstr')
+
+    def __events(self, pieces, classify=True, lazy=False):
+        def fallback(text, line_no, data, errors):
+            return self.__parse(input_buffer(text), 0, 0, line_no, errors, data)
+        return fast_scanner.scan_events(pieces, fallback, classify, lazy)
+
+    def __resolve(self, values, index):
+        # decode a lazy value in place
+        value = values[index]
+        if(type(value) is LazyValue):
+            value = value.value()
+            if(self.__data['intern']):
+                value = intern_value(value)
+            values[index] = value
+        return value
+
+    @staticmethod
+    def parse_many(fnames, workers=None, values='s', engine='apg', intern=False):
+        '''Parse many INI files in parallel over a pool of processes.
+        Each pool process parses whole files and sends back only the
+        global and section dictionaries and the error display.
+        @param fnames The names of the INI files to parse.
+        @param workers The number of pool processes, default os.cpu_count().
+        @param values The values mode of the IniFile objects, see the constructor.
+        @param engine The parsing engine, see the constructor.
+        @param intern If True, the names and short values are interned, see the constructor.
+        They are interned again in this process as they are received.
+        @returns Yields a tuple (fname, ini, seconds) as each file is finished,
+        where ini is the parsed IniFile object and seconds is the parse time
+        in the pool process. Exceptions raised while parsing a file,
+        for example for a missing file, are raised here.
+        '''
+        # validate the arguments before starting the pool
+        IniFile(values, engine=engine)
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = {}
+        try:
+            for fname in fnames:
+                futures[pool.submit(parse_file, fname, values, engine, intern=intern)] = fname
+            for future in as_completed(futures):
+                data, seconds = future.result()
+                if(intern):
+                    data = intern_data(data)
+                ini = IniFile(values, engine=engine, intern=intern)
+                ini._restore(data)
+                yield futures[future], ini, seconds
+        finally:
+            # if stopped early, cancel the pending files and do not wait for the running ones
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def dump_snapshot(self, fname=None):
+        '''Convert the parsed data to a compact binary snapshot, see snapshot.py.
+        Loading a snapshot with load_snapshot() is much faster than parsing the INI file.
+        @param fname If not None, the name of a file to write the snapshot to.
+        @returns Returns the snapshot as bytes.
+        '''
+        data = snapshot.dump(self._export())
+        if(fname):
+            with open(fname, 'wb') as fd:
+                fd.write(data)
+        return data
+
+    def load_snapshot(self, data=None, fname=None):
+        '''Load the parsed data from a snapshot made with dump_snapshot().
+        The snapshot replaces any previously parsed data.
+        The values mode is that of this IniFile object, not the one that made the snapshot.
+        @param data The snapshot as bytes or any bytes-like object.
+        @param fname The name of a snapshot file. The file is memory mapped.
+        @returns Raises Exception if the snapshot is not valid.
+        '''
+        if(fname):
+            with open(fname, 'rb') as fd:
+                if(os.fstat(fd.fileno()).st_size):
+                    with MemoryMap(fd.fileno(), 0, access=ACCESS_READ) as input:
+                        self._restore(snapshot.load(input))
+                    return
+                data = b''
+        self._restore(snapshot.load(data))
+
+    def _export(self):
+        '''Export the parsed data (for use within the python_ini package).
+        Lazy values are decoded first.
+        @returns Returns a tuple (global, sections, errors) of the global key dictionary,
+        the section dictionary and the errors display, all of plain Python types.
+        '''
+        if(self.__lazy):
+            for keys in [self.__data['global']] + list(self.__data['sections'].values()):
+                for values in keys.values():
+                    for i in range(len(values)):
+                        self.__resolve(values, i)
+        return (self.__data['global'], self.__data['sections'], self.errors)
+
+    def _restore(self, data):
+        '''Restore the parsed data from _export() (for use within the python_ini package).
+        @param data The tuple (global, sections, errors) from _export().
+        '''
+        self.__views = {}
+        self.__index = None
+        self.__edits = None
         self.__data['current_section'] = None
         self.__data['current_key'] = None
-        self.__data['global'] = {}
-        self.__data['sections'] = {}
-        self.__ast.translate(self.__data)
+        self.__data['global'] = data[0]
+        self.__data['sections'] = data[1]
+        self.errors = data[2]
+
+    def freeze(self):
+        '''Get the parsed data as a read-only ParsedIni object, see parsed_ini.py.
+        The ParsedIni object may be shared by many threads without locks.
+        It shares no data with this IniFile object, which may go on to parse other input.
+        Lazy values are decoded first.
+        @returns Returns the ParsedIni object.
+        '''
+        return ParsedIni(self._export(), self.__data['values'], self.__path_sep)
+
+    @property
+    def errors(self):
+        '''The errors display of the parse, None if there are no errors, see display_errors().'''
+        if(self.__errors_stale):
+            self.__errors = error_display(self.__edits.error_reports())
+            self.__errors_stale = False
+        return self.__errors
+
+    @errors.setter
+    def errors(self, errors):
+        self.__errors = errors
+        self.__errors_stale = False
 
     def display_errors(self):
         '''Converts any errors found in the INI file syntax to
@@ -136,14 +618,24 @@ class IniFile:
             display = copy.copy(self.errors)
         return display
 
-    def get_keys(self):
+    def __view(self, name, keys):
+        # name is None for the global keys, True for the section names
+        # and (section,) for the keys of a section
+        view = self.__views.get(name)
+        if(view is None):
+            view = tuple(keys)
+            self.__views[name] = view
+        return view
+
+    def get_keys(self, view=False):
         '''Get a list of the global key names.
+        @param view If True, a read-only tuple is returned instead of a list.
+        The tuple is built only once for each parse.
         @returns Returns a list, possibly empty, of global key names.
         '''
-        keys = []
-        for key, value in self.__data['global'].items():
-            keys.append(key)
-        return keys
+        if(view):
+            return self.__view(None, self.__data['global'])
+        return list(self.__data['global'])
 
     def get_values(self, key, default=None):
         '''Get the list of values for a global key name.
@@ -165,30 +657,41 @@ class IniFile:
         if(self.__data['values'] == 'm'):
             if(len(values) == 0):
                 return [True]
+            if(self.__lazy):
+                for i in range(len(values)):
+                    self.__resolve(values, i)
             return values
         if(len(values) == 0):
             return True
+        if(self.__lazy):
+            return self.__resolve(values, len(values) - 1)
         return values[len(values) - 1]
 
-    def get_sections(self):
+    def get_sections(self, view=False):
         '''Get a list of the section names.
+        @param view If True, a read-only tuple is returned instead of a list.
+        The tuple is built only once for each parse.
         @returns Returns a list, possibly empty, of section names.
         '''
-        sections = []
-        for key, value in self.__data['sections'].items():
-            sections.append(key)
-        return sections
+        if(view):
+            return self.__view(True, self.__data['sections'])
+        return list(self.__data['sections'])
 
-    def get_section_keys(self, section):
+    def get_section_keys(self, section, view=False):
         '''Get a list of key names in the named section.
         @param section The section name to find the key names in .
+        @param view If True, a read-only tuple is returned instead of a list.
+        The tuple is built only once for each parse.
         @returns Returns a list, possibly empty, of key names.
         '''
-        keys = []
-        if(self.__data['sections'].get(section)):
-            for key, value in self.__data['sections'][section].items():
-                keys.append(key)
-        return keys
+        keys = self.__data['sections'].get(section)
+        if(view):
+            if(keys is None):
+                return ()
+            return self.__view((section,), keys)
+        if(keys is None):
+            return []
+        return list(keys)
 
     def get_section_values(self, section, key, default=None):
         '''Get a list of values for the named key in the named section.
@@ -205,16 +708,115 @@ class IniFile:
             - the full list of values if the multiple values switch, "m", is set in the constructor
             - the last name in the list if the single value switch, "s", is set in the constructor
         '''
-        if(self.__data['sections'].get(section) is None):
+        keys = self.__data['sections'].get(section)
+        if(keys is None):
             return default
-        values = self.__data['sections'][section].get(key)
+        values = keys.get(key)
         if(values is None):
             return default
         if(self.__data['values'] == 'm'):
             if(len(values) == 0):
                 return [True]
+            if(self.__lazy):
+                for i in range(len(values)):
+                    self.__resolve(values, i)
             return values
         # to get here self.__data['values'] == 's'
         if(len(values) == 0):
             return True
+        if(self.__lazy):
+            return self.__resolve(values, len(values) - 1)
         return values[len(values) - 1]
+
+    def __build_index(self):
+        # map (section, key) and the path of each key to its getter result
+        index = {}
+        multi = self.__data['values'] == 'm'
+        sections = [(None, self.__data['global'])]
+        sections.extend(self.__data['sections'].items())
+        for section, keys in sections:
+            for key, values in keys.items():
+                if(len(values) == 0):
+                    value = [True] if(multi) else True
+                elif(multi):
+                    if(self.__lazy):
+                        for i in range(len(values)):
+                            self.__resolve(values, i)
+                    value = values
+                elif(self.__lazy):
+                    value = self.__resolve(values, len(values) - 1)
+                else:
+                    value = values[len(values) - 1]
+                index[(section, key)] = value
+                if(section is None):
+                    index[key] = value
+                else:
+                    index[section + self.__path_sep + key] = value
+        self.__index = index
+        return index
+
+    def __getitem__(self, path):
+        '''Get the values of a key by its path, ini[path].
+        @param path The path, "section/key" or "key" for a global key
+        (see the path_sep constructor argument), or a tuple (section, key)
+        where section is None for a global key.
+        @returns Returns the same values as get_values() or get_section_values().
+        Raises KeyError if the key is not found.
+        '''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return index[path]
+
+    def get(self, path, default=None):
+        '''Get the values of a key by its path.
+        The path index is built once for each parse and each call is a single dictionary lookup.
+        @param path The path of the key, see __getitem__().
+        @param default The value to return if the key is not found.
+        @returns Returns the same values as get_values() or get_section_values().
+        '''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return index.get(path, default)
+
+    def get_many(self, paths, default=None):
+        '''Get the values of many keys by their paths.
+        @param paths An iterable of key paths, see __getitem__().
+        @param default The value to return for keys that are not found.
+        @returns Returns a list of values in the order of the paths.
+        '''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        get = index.get
+        return [get(path, default) for path in paths]
+
+    def extract(self, spec, into=None):
+        '''Get the values of many keys at once, converted to the required types.
+        For example,
+        <pre>
+        config = ini.extract({
+            'port': ('server/port', int),
+            'host': ('server/host', str, 'localhost'),
+            'debug': ('debug', bool, False)})
+        </pre>
+        @param spec A dictionary of name: (path, type) or (path, type, default) where
+            - path is the key path, see __getitem__()
+            - type is None (no conversion), bool (the value must be a boolean),
+                list (a single value is put in a list) or any other type or function
+                which converts the value, e.g. int, float or str.
+                Lossy conversions are errors: a boolean to a number type
+                and a float with a fraction to an integer type.
+                In multi-valued mode each value of the list is converted.
+            - default, if given, is used as is, without conversion, if the key is not found.
+                Otherwise a missing key is an error.
+        @param into If not None, a class, for example a dataclass,
+        which is constructed with the names and values as keyword arguments.
+        @returns Returns a dictionary of name: value, or the into object.
+        Raises a single Exception listing all missing keys and conversion errors.
+        '''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return extract_values(index, spec, into, 'IniFile.extract()')
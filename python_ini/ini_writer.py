@@ -4,11 +4,26 @@
 The writer is configurable to specify optional delimiters, boolean values
 and tab space for inline comments.
 '''
+import re
+
+SURROGATES = re.compile(r'[\ud800-\udfff]')
+CONTROLS = re.compile(r'[\x00-\x1f\x7f]')
+# the escaped forms of the ASCII control characters
+CONTROL_ESCAPES = {}
+for c in list(range(32)) + [127]:
+    CONTROL_ESCAPES[chr(c)] = '\\x%02x' % c
+CONTROL_ESCAPES['\t'] = '\\t'
+CONTROL_ESCAPES['\n'] = '\\n'
+CONTROL_ESCAPES['\r'] = '\\r'
+
+
+def escape_control(m):
+    return CONTROL_ESCAPES[m.group()]
 
 
 class IniWriter:
 
-    def __init__(self):
+    def __init__(self, fname=None, fhandle=None):
         '''Ini file writer constructor.
         Note that configurable values are set to defaults.
             - True = 'true'
@@ -18,7 +33,29 @@ class IniWriter:
             - = for key/value delimiter
             - , for value list delimiter
             - column 40 for tab to inline comments
+
+        If fname or fhandle is given, the writer is in streaming mode.
+        Each section(), key() and comment() line is formatted and written
+        to the file immediately and nothing is kept in memory.
+        Configuration changes apply only to the lines added after them.
+        to_string(), iter_lines(), write_stream() and write() are not available.
+        Call close() when done or use the writer as a context manager,
+        <pre>
+        with IniWriter('output.ini') as w:
+            w.key('key', 'value')
+        </pre>
+        @param fname The name of a file to create (or truncate) and write to.
+        @param fhandle A handle to a file opened for writing in text mode.
+        The handle is flushed, but not closed, by close().
         '''
+        self.__streaming = bool(fname or fhandle)
+        self.__owner = False
+        self.__stream = None
+        if(fname):
+            self.__stream = open(fname, 'w')
+            self.__owner = True
+        elif(fhandle):
+            self.__stream = fhandle
 
         self.__SECTION = 0
         self.__KEY = 1
@@ -86,45 +123,16 @@ class IniWriter:
         return comment
 
     def __normalize_string(self, string):
-        v = ''
-        for s in string:
-            c = ord(s)
-            if(c >= 32 and c <= 126):
-                v += s
-            elif(c == 9):
-                v += '\\t'
-            elif(c == 10):
-                v += '\\n'
-            elif(c == 13):
-                v += '\\r'
-            elif(c == 39):
-                v += "\\'"
-            elif(c <= 0xff):
-                h = str(hex(c))
-                h = h[2:]
-                if(len(h) == 1):
-                    h = '0' + h
-                v += '\\x' + h
-            elif(c < 0xd800 or (c >= 0xe000 and c <= 0xffff)):
-                h = str(hex(c))
-                h = h[2:]
-                while(len(h) < 4):
-                    h = '0' + h
-                v += '\\u' + h
-            elif(c >= 0xd800 and c < 0xe000):
-                raise Exception(
-                    'IniWriter: string has Unicode surrogate value', string)
-            elif(c <= 0x10ffff):
-                h = str(hex(c))
-                h = h[2:]
-                while(len(h) < 8):
-                    h = '0' + h
-                v += '\\U' + h
-            else:
-                # Note: will probably never get here
-                raise Exception(
-                    'IniWriter: string has Unicode value out of range (>0x10FFFF)', string)
-        return "'" + v + "'"
+        if(string.isascii() and string.isprintable()):
+            # all characters are printing ASCII, 32-126
+            return "'" + string + "'"
+        if(SURROGATES.search(string)):
+            raise Exception(
+                'IniWriter: string has Unicode surrogate value', string)
+        # the backslashreplace codec escapes all non-ASCII characters
+        # exactly as \xhh, \uhhhh or \Uhhhhhhhh with lower case hex digits
+        v = string.encode('ascii', 'backslashreplace').decode('ascii')
+        return "'" + CONTROLS.sub(escape_control, v) + "'"
 
     def booleans(self, true=False, false=False, none=False):
         '''Sets the values to specify for boolean (and null) values.
@@ -214,8 +222,7 @@ class IniWriter:
         @returns Raises Exception on invalid name or comment.
         '''
         self.__validate_name(name)
-        self.__lines.append(
-            [self.__SECTION, name, self.__normalize_comment(comment)])
+        self.__add([self.__SECTION, name, self.__normalize_comment(comment)])
 
     def key(self, name, varg, comment=None):
         '''Add a key/value line to the INI file.
@@ -252,8 +259,7 @@ class IniWriter:
             else:
                 raise Exception('IniWriter.key(): invalid value', value)
             vlist.append(v)
-        self.__lines.append(
-            [self.__KEY, name, vlist, self.__normalize_comment(comment)])
+        self.__add([self.__KEY, name, vlist, self.__normalize_comment(comment)])
 
     def comment(self, comment=None):
         '''Add a comment line to the INI file.
@@ -263,68 +269,102 @@ class IniWriter:
             - string of printing ASCII characters only, char codes 32-126
         @returns Raises Exception on invalid ncomment.
         '''
-        self.__lines.append(
-            [self.__COMMENT, self.__normalize_comment(comment)])
+        self.__add([self.__COMMENT, self.__normalize_comment(comment)])
 
-    def to_string(self):
-        '''Convert all lines added with the section(), key() and comment() functions
-        to a valid, formatted INI file.
-        @returns The formatted INI file as a string.
+    def __add(self, line):
+        if(not self.__streaming):
+            self.__lines.append(line)
+        elif(self.__stream is None):
+            raise Exception('IniWriter: the output file is closed')
+        else:
+            self.__stream.writelines(self.__format(line))
+
+    def close(self):
+        '''Close the output of a streaming writer.
+        A file opened from fname is closed, a file handle is flushed.
+        Has no effect if the writer is not streaming or is already closed.
         '''
+        stream = self.__stream
+        self.__stream = None
+        if(stream is None):
+            return
+        if(self.__owner):
+            stream.close()
+        else:
+            stream.flush()
 
-        def indent(n):
-            out = ''
-            while(n):
-                out += ' '
-                n -= 1
-            return out
+    def __enter__(self):
+        return self
 
-        def add_comment(out, comment):
-            lout = len(out)
-            if(not comment):
-                add = self.__LINE_END
-            elif(lout >= self.__comment_tab):
-                add = self.__LINE_END
-                add += indent(self.__comment_tab)
-                add += self.__comment_delim + comment
-                add += self.__LINE_END
-            else:
-                add = indent(self.__comment_tab - lout)
-                add += self.__comment_delim + comment
-                add += self.__LINE_END
-            return add
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __check_buffered(self, function):
+        if(self.__streaming):
+            raise Exception(
+                'IniWriter.' + function + '(): not available in streaming mode')
 
+    def __format(self, line):
         # key line      = [id, name, value, comment]
         # section line  = [id, name, comment]
         # comment line  = [id, comment]
-        out = ''
-        for line in self.__lines:
-            if(line[0] == self.__COMMENT):
-                if(line[1] == ''):
-                    out += self.__LINE_END
-                else:
-                    if(line[1] is None):
-                        out += self.__LINE_END
-                    else:
-                        out += self.__comment_delim + line[1] + self.__LINE_END
-            elif(line[0] == self.__KEY):
-                out_line = line[1] + self.__key_delim
-                count = 0
-                for v in line[2]:
-                    if(count > 0):
-                        out_line += self.__value_delim
-                    out_line += v
-                    count += 1
-                out += out_line + add_comment(out_line, line[3])
+        # yields the formatted INI file line(s)
+        if(line[0] == self.__COMMENT):
+            if(line[1]):
+                yield self.__comment_delim + line[1] + self.__LINE_END
             else:
-                out_line = '[' + line[1] + ']'
-                out += out_line + add_comment(out_line, line[2])
-        return out
+                yield self.__LINE_END
+            return
+        if(line[0] == self.__KEY):
+            out_line = line[1] + self.__key_delim + \
+                self.__value_delim.join(line[2])
+            comment = line[3]
+        else:
+            out_line = '[' + line[1] + ']'
+            comment = line[2]
+        if(not comment):
+            yield out_line + self.__LINE_END
+        elif(len(out_line) >= self.__comment_tab):
+            yield out_line + self.__LINE_END
+            yield ' ' * self.__comment_tab + self.__comment_delim + \
+                comment + self.__LINE_END
+        else:
+            yield out_line + ' ' * (self.__comment_tab - len(out_line)) + \
+                self.__comment_delim + comment + self.__LINE_END
+
+    def iter_lines(self):
+        '''Format all lines added with the section(), key() and comment() functions.
+        @returns Yields the lines of the formatted INI file, one at a time,
+        each with its line end. A line whose inline comment does not fit
+        before the comment tab is followed by a separate comment line.
+        '''
+        self.__check_buffered('iter_lines')
+        for line in self.__lines:
+            yield from self.__format(line)
+
+    def to_string(self):
+        '''Convert all lines added with the section(), key() and comment() functions
+        to a valid, formatted INI file.
+        @returns The formatted INI file as a string.
+        '''
+        self.__check_buffered('to_string')
+        return ''.join(self.iter_lines())
+
+    def write_stream(self, fhandle):
+        '''Write the formatted INI file to an open file, one line at a time.
+        The full INI file is never held in memory as a single string.
+        @param fhandle A handle to a file opened for writing in text mode.
+        @return Raises exceptions on write errors.
+        '''
+        self.__check_buffered('write_stream')
+        fhandle.writelines(self.iter_lines())
 
     def write(self, fname):
-        '''Write the formatted INI file to a file. Calls to_string().
+        '''Write the formatted INI file to a file. Calls write_stream().
         @param fname The file name to write the INI file to.
         @return Raises exceptions on file open or write errors.
         '''
+        self.__check_buffered('write')
         with open(fname, 'w') as fd:
-            fd.write(self.to_string())
+            self.write_stream(fd)
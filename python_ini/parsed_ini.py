@@ -0,0 +1,276 @@
+''' @file python_ini/parsed_ini.py
+@brief The read-only parse result, see ParsedIni and IniFile.freeze().
+
+For example,
+<pre>
+parser = IniFile(engine='fast')
+parser.parse(fname='server.ini')
+config = parser.freeze()
+...
+# in any thread, without locks
+port = config.get_section_values('server', 'port')
+</pre>
+A ParsedIni object shares no data with the IniFile object that made it.
+Its dictionaries are read-only mappings (types.MappingProxyType) and its
+lists of values are tuples, so it may be read by many threads while the
+IniFile object parses other files.
+'''
+import re
+import numbers
+from types import MappingProxyType
+from python_ini.fast_scanner import NAME
+
+NAME_ONLY = re.compile(NAME)
+
+
+def check_path_sep(path_sep):
+    '''Check the separator of section and key names in the key paths, see IniFile().
+    A separator made only of name characters is rejected, because then a global key,
+    for example "a.b", could have the same path as a key in a section, "b" in "a".
+    @param path_sep The separator.
+    @returns Raises an Exception if the separator is not valid.
+    '''
+    if(not (isinstance(path_sep, str) and path_sep)):
+        raise Exception('path_sep must be a non-empty string', path_sep)
+    if(NAME_ONLY.fullmatch(path_sep)):
+        msg = 'path_sep must have a character that is not allowed in section and key names'
+        raise Exception(msg, path_sep)
+
+
+def convert_value(convert, value):
+    '''Convert a value for IniFile.extract().
+    @param convert The type or conversion function.
+    @param value The value.
+    Conversions that lose information are refused: a boolean is not a number
+    and a float is an integer only if it has no fraction.
+    @returns Returns the converted value. Raises TypeError or ValueError.
+    '''
+    if(convert is bool):
+        if(not isinstance(value, bool)):
+            raise TypeError('%r is not a boolean' % (value,))
+        return value
+    if(isinstance(convert, type)):
+        if(type(value) is convert):
+            return value
+        if(issubclass(convert, numbers.Number)):
+            if(isinstance(value, bool)):
+                raise TypeError('%r is not a number' % (value,))
+            if(issubclass(convert, numbers.Integral) and isinstance(value, float)
+               and not value.is_integer()):
+                raise ValueError('%r is not an integer' % (value,))
+    return convert(value)
+
+
+def extract_values(index, spec, into, caller):
+    '''Get and convert the values of many keys, see IniFile.extract().
+    @param index The path index, a dictionary of path: getter result.
+    @param spec The dictionary of name: (path, type) or (path, type, default).
+    @param into If not None, a class constructed with the names and values as keyword arguments.
+    @param caller The name of the caller for the error message.
+    @returns Returns a dictionary of name: value, or the into object.
+    Raises a single Exception listing all missing keys and conversion errors.
+    '''
+    result = {}
+    errors = []
+    missing = object()
+    for name, item in spec.items():
+        path = item[0]
+        value = index.get(path, missing)
+        if(value is missing):
+            if(len(item) > 2):
+                result[name] = item[2]
+            else:
+                errors.append('%s: key %r not found' % (name, path))
+            continue
+        convert = item[1]
+        try:
+            if(convert is None):
+                pass
+            elif(convert is list):
+                value = list(value) if(isinstance(value, (list, tuple))) else [value]
+            elif(isinstance(value, (list, tuple))):
+                value = [convert_value(convert, v) for v in value]
+            else:
+                value = convert_value(convert, value)
+        except (TypeError, ValueError) as e:
+            errors.append('%s: key %r: %s' % (name, path, e))
+            continue
+        result[name] = value
+    if(errors):
+        raise Exception(caller + ': ' + '; '.join(errors), errors)
+    if(into is not None):
+        return into(**result)
+    return result
+
+
+def freeze_keys(keys):
+    # a read-only copy of a key dictionary, with the values lists as tuples
+    return MappingProxyType({key: tuple(values) for key, values in keys.items()})
+
+
+class ParsedIni:
+    '''The read-only, thread-safe result of a parse, made by IniFile.freeze().
+    The getters are the same as those of IniFile, except that
+    the multi-valued lists of values are tuples.'''
+    __slots__ = ('__values', '__path_sep', '__global', '__sections', '__errors',
+                 '__views', '__index')
+
+    def __init__(self, data, values='s', path_sep='/'):
+        '''ParsedIni constructor.
+        @param data The tuple (global, sections, errors) of IniFile._export(),
+        without lazy values. The dictionaries and lists are copied.
+        @param values The values mode, 's' or 'm', see IniFile().
+        @param path_sep The separator of section and key names in the paths, see IniFile().
+        '''
+        if(not (values == 'm' or values == 's')):
+            msg = 'values must be "s" (single-valued) or "m" (multi-valued)'
+            raise Exception(msg, values)
+        check_path_sep(path_sep)
+        sections = {name: freeze_keys(keys) for name, keys in data[1].items()}
+        # the attributes are set once, here, and by __build_index()
+        init = object.__setattr__
+        init(self, '_ParsedIni__values', values)
+        init(self, '_ParsedIni__path_sep', path_sep)
+        init(self, '_ParsedIni__global', freeze_keys(data[0]))
+        init(self, '_ParsedIni__sections', MappingProxyType(sections))
+        init(self, '_ParsedIni__errors', data[2])
+        # the key name tuples and the path index, built on first use
+        # two threads may both build one, either result is kept and is the same
+        init(self, '_ParsedIni__views', {})
+        init(self, '_ParsedIni__index', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ParsedIni is read-only', name)
+
+    def __delattr__(self, name):
+        raise AttributeError('ParsedIni is read-only', name)
+
+    @property
+    def errors(self):
+        '''The errors display of the parse, None if there are none.'''
+        return self.__errors
+
+    @property
+    def values(self):
+        '''The values mode, 's' or 'm'.'''
+        return self.__values
+
+    @property
+    def global_keys(self):
+        '''The read-only mapping of the global key names to their tuples of values.'''
+        return self.__global
+
+    @property
+    def sections(self):
+        '''The read-only mapping of the section names to their read-only
+        mappings of key names to tuples of values.'''
+        return self.__sections
+
+    def display_errors(self):
+        '''See IniFile.display_errors().'''
+        return self.__errors
+
+    def __view(self, name, keys):
+        view = self.__views.get(name)
+        if(view is None):
+            view = tuple(keys)
+            self.__views[name] = view
+        return view
+
+    def __result(self, values):
+        # the getter result of a tuple of values
+        if(self.__values == 'm'):
+            if(len(values) == 0):
+                return (True,)
+            return values
+        if(len(values) == 0):
+            return True
+        return values[len(values) - 1]
+
+    def get_keys(self, view=False):
+        '''See IniFile.get_keys().'''
+        if(view):
+            return self.__view(None, self.__global)
+        return list(self.__global)
+
+    def get_values(self, key, default=None):
+        '''See IniFile.get_values().
+        @returns In multi-valued mode the values are a tuple, (True,) for a flag.
+        '''
+        values = self.__global.get(key)
+        if(values is None):
+            return default
+        return self.__result(values)
+
+    def get_sections(self, view=False):
+        '''See IniFile.get_sections().'''
+        if(view):
+            return self.__view(True, self.__sections)
+        return list(self.__sections)
+
+    def get_section_keys(self, section, view=False):
+        '''See IniFile.get_section_keys().'''
+        keys = self.__sections.get(section)
+        if(view):
+            if(keys is None):
+                return ()
+            return self.__view((section,), keys)
+        if(keys is None):
+            return []
+        return list(keys)
+
+    def get_section_values(self, section, key, default=None):
+        '''See IniFile.get_section_values().
+        @returns In multi-valued mode the values are a tuple, (True,) for a flag.
+        '''
+        keys = self.__sections.get(section)
+        if(keys is None):
+            return default
+        values = keys.get(key)
+        if(values is None):
+            return default
+        return self.__result(values)
+
+    def __build_index(self):
+        index = {}
+        sections = [(None, self.__global)]
+        sections.extend(self.__sections.items())
+        for section, keys in sections:
+            for key, values in keys.items():
+                value = self.__result(values)
+                index[(section, key)] = value
+                if(section is None):
+                    index[key] = value
+                else:
+                    index[section + self.__path_sep + key] = value
+        object.__setattr__(self, '_ParsedIni__index', index)
+        return index
+
+    def __getitem__(self, path):
+        '''See IniFile.__getitem__().'''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return index[path]
+
+    def get(self, path, default=None):
+        '''See IniFile.get().'''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return index.get(path, default)
+
+    def get_many(self, paths, default=None):
+        '''See IniFile.get_many().'''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        get = index.get
+        return [get(path, default) for path in paths]
+
+    def extract(self, spec, into=None):
+        '''See IniFile.extract().'''
+        index = self.__index
+        if(index is None):
+            index = self.__build_index()
+        return extract_values(index, spec, into, 'ParsedIni.extract()')
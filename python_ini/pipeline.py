@@ -0,0 +1,88 @@
+''' @file python_ini/pipeline.py
+@brief The shared, prepared apg-py parser and AST for the IniFile class.
+
+Building the parser from the grammar object and registering the parser and
+AST callback functions is done only once per process for each debug mode.
+All IniFile objects share the prepared pipeline.
+The parser and AST hold the state of a single parse, so the pipeline
+lock must be held from the parse through the AST translation,
+after which release() drops the state of the parse.
+'''
+import sys
+import os
+import threading
+# add the current working directory to the path
+# DO NOT MOVE THE FOLLOWING STATEMENT
+# if using autopep8 formatter, for example, set argument '--ignore=E402'
+sys.path.append(os.getcwd())
+from apg_py.lib.parser import Parser
+from apg_py.lib.trace import Trace
+from apg_py.lib.ast import Ast
+import python_ini.grammar as grammar
+import python_ini.parser_callbacks as pcb
+import python_ini.ast_callbacks as acb
+
+
+class Pipeline:
+    '''The parser and AST with all callback functions registered.'''
+
+    def __init__(self, debug=False):
+        '''Pipeline constructor.
+        @param debug If True, a trace of each parse is printed to stdout.
+        '''
+        self.lock = threading.Lock()
+        self.parser = Parser(grammar)
+        if(debug):
+            Trace(self.parser, mode='xc')
+        self.parser.add_callbacks({'line-end': pcb.line_end})
+        self.parser.add_callbacks({'bad-section-line': pcb.bad_section_line})
+        self.parser.add_callbacks({'bad-value-line': pcb.bad_value_line})
+        self.parser.add_callbacks({'bad-blank-line': pcb.bad_blank_line})
+        self.parser.add_callbacks({'u_unicode8': pcb.unicode8})
+        self.parser.add_callbacks({'u_unicode4': pcb.unicode4})
+        self.parser.add_callbacks({'u_hexadecimal': pcb.hexadecimal})
+        self.parser.add_callbacks({'u_escaped-error': pcb.escaped_error})
+        self.ast = Ast(self.parser)
+        self.ast.add_callback('section-name', acb.section_name)
+        self.ast.add_callback('key-name', acb.key_name)
+        self.ast.add_callback('value', acb.value)
+        self.ast.add_callback('d-quoted-value', acb.d_value)
+        self.ast.add_callback('s-quoted-value', acb.s_value)
+        self.ast.add_callback('string', acb.string_value)
+        self.ast.add_callback('true', acb.true_value)
+        self.ast.add_callback('false', acb.false_value)
+        self.ast.add_callback('null', acb.null_value)
+        self.ast.add_callback('int', acb.int_value)
+        self.ast.add_callback('float', acb.float_value)
+
+    def release(self):
+        '''Drop the input, the AST records and the user data of the last parse,
+        so that the shared pipeline does not keep them alive.
+        Call with the lock held, after the AST translation.
+        '''
+        self.parser.input = None
+        self.parser.cbData = None
+        self.ast.input = []
+        self.ast.records = []
+        self.ast.indexStack = []
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(debug=False):
+    '''Get the process-wide pipeline for the debug mode,
+    creating it on first use.
+    @param debug If True, get the tracing pipeline.
+    @returns Returns the shared Pipeline object.
+    '''
+    debug = bool(debug)
+    pipeline = _pipelines.get(debug)
+    if(pipeline is None):
+        with _pipelines_lock:
+            pipeline = _pipelines.get(debug)
+            if(pipeline is None):
+                pipeline = Pipeline(debug)
+                _pipelines[debug] = pipeline
+    return pipeline
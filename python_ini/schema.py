@@ -0,0 +1,176 @@
+''' @file python_ini/schema.py
+@brief Schemas for validating and converting INI file values while parsing.
+
+For example,
+<pre>
+schema = Schema({
+    None: {'debug': bool},                              # global keys
+    'server': {
+        'port': Key(int, min=1, max=65535),
+        'host': str,
+        'mode': Key(str, choices=['fast', 'safe']),
+        'ratio': float,
+        'hosts': Key(str, multi=True)}})
+ini = IniFile(schema=schema)
+</pre>
+Validation runs in the AST translation (see the data helpers in ast_callbacks.py)
+and in the fast engine's line scanner. Each problem is reported in IniFile.errors
+along with the syntax errors, with the line number of its section or key name,
+and the offending section, key or value is not kept.
+'''
+from python_ini.ast_callbacks import LazyValue
+
+TYPES = {None: 'any', bool: 'bool', int: 'int', float: 'float', str: 'str'}
+
+
+class Key:
+    '''The specification of a key's values.'''
+
+    def __init__(self, type=None, min=None, max=None, choices=None, multi=False):
+        '''Key constructor.
+        @param type The value type, one of None (any), bool, int, float or str.
+        Integer values are converted to float for float keys and to str for str keys.
+        A key without a value (a true flag) is not checked.
+        @param min If not None, the minimum value of a number.
+        @param max If not None, the maximum value of a number.
+        @param choices If not None, a list of the allowed values.
+        @param multi If False, the key may have only one value.
+        '''
+        if(type not in TYPES):
+            raise Exception(
+                'Schema Key: type must be one of None, bool, int, float or str', type)
+        self.type = type
+        self.min = min
+        self.max = max
+        self.choices = choices
+        self.multi = multi
+
+    def check(self, value):
+        '''Validate and convert a value.
+        @param value The value.
+        @returns Returns a tuple (value, message) where
+        message is None if the value is valid.
+        '''
+        t = self.type
+        if(isinstance(value, LazyValue) and t is not None and t is not str):
+            # not valid, decode it for the message
+            value = value.value()
+        if(t is None):
+            pass
+        elif(t is str):
+            if(type(value) is int):
+                value = str(value)
+            elif(not isinstance(value, (str, LazyValue))):
+                return None, 'expected str, found %r' % (value,)
+        elif(t is float):
+            if(type(value) is int):
+                value = float(value)
+            elif(type(value) is not float):
+                return None, 'expected float, found %r' % (value,)
+        elif(type(value) is not t):
+            return None, 'expected %s, found %r' % (TYPES[t], value)
+        if(self.min is not None or self.max is not None):
+            if(type(value) not in (int, float)):
+                if(isinstance(value, LazyValue)):
+                    value = value.value()
+                return None, 'expected a number, found %r' % (value,)
+            if(self.min is not None and value < self.min):
+                return None, '%r is less than the minimum %r' % (value, self.min)
+            if(self.max is not None and value > self.max):
+                return None, '%r is greater than the maximum %r' % (value, self.max)
+        if(self.choices is not None):
+            if(isinstance(value, LazyValue)):
+                value = value.value()
+            if(value not in self.choices):
+                return None, '%r is not one of %r' % (value, self.choices)
+        return value, None
+
+
+class Schema:
+    '''A compiled schema of the allowed sections, keys and values.'''
+
+    def __init__(self, sections, unknown_sections=False, unknown_keys=False):
+        '''Schema constructor.
+        @param sections A dictionary of section name: keys, where None is the global section
+        and keys is a dictionary of key name: Key object or type (see Key).
+        @param unknown_sections If True, sections not in the schema are allowed
+        and their keys are not checked.
+        @param unknown_keys If True, keys not in the schema are allowed and not checked.
+        '''
+        self.unknown_sections = unknown_sections
+        self.unknown_keys = unknown_keys
+        self.sections = {}
+        for section, keys in sections.items():
+            compiled = {}
+            for name, key in keys.items():
+                compiled[name] = key if(isinstance(key, Key)) else Key(key)
+            self.sections[section] = compiled
+
+    def error(self, data, message):
+        data['schema_errors'].append(
+            {'line': data['line'], 'message': 'schema: ' + message})
+
+    def begin(self, data):
+        '''Begin a parse in the global section.
+        @param data The IniFile data.
+        '''
+        keys = self.sections.get(None)
+        if(keys is None and not self.unknown_sections):
+            keys = {}
+        data['schema_keys'] = keys
+        data['schema_key'] = None
+        data['schema_skip'] = False
+
+    def open_section(self, data, name):
+        '''Begin a section.
+        @param data The IniFile data.
+        @param name The section name.
+        @returns Returns False if the section is not allowed.
+        '''
+        keys = self.sections.get(name)
+        data['schema_keys'] = keys
+        data['schema_skip'] = False
+        if(keys is None and not self.unknown_sections):
+            data['schema_skip'] = True
+            self.error(data, 'unknown section "%s"' % name)
+            return False
+        return True
+
+    def open_key(self, data, name):
+        '''Begin a key in the current section.
+        @param data The IniFile data.
+        @param name The key name.
+        @returns Returns False if the key is not allowed.
+        '''
+        data['schema_key'] = None
+        if(data['schema_skip']):
+            return False
+        keys = data['schema_keys']
+        if(keys is None):
+            # unknown sections are allowed
+            return True
+        key = keys.get(name)
+        if(key is None and not self.unknown_keys):
+            self.error(data, 'unknown key "%s"' % name)
+            return False
+        data['schema_key'] = key
+        return True
+
+    def check_value(self, data, values, value):
+        '''Check a value of the current key.
+        @param data The IniFile data.
+        @param values The key's list of values so far.
+        @param value The value.
+        @returns Returns a tuple (value, valid).
+        '''
+        key = data['schema_key']
+        if(key is None):
+            return value, True
+        if(len(values) and not key.multi):
+            self.error(data, 'key "%s" may have only one value' % data['current_key'])
+            return value, False
+        value, message = key.check(value)
+        if(message is not None):
+            self.error(data, 'key "%s": %s' % (data['current_key'], message))
+            return value, False
+        return value, True
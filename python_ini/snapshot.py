@@ -0,0 +1,204 @@
+''' @file python_ini/snapshot.py
+@brief A compact, versioned binary format for parsed INI file data.
+
+See IniFile.dump_snapshot() and IniFile.load_snapshot().
+All numbers are little-endian. Every string, section and key names, string values
+and the errors display, is stored once in a string table and referred to by index.
+<pre>
+header          magic "PYINISNP", u16 format version, u16 reserved,
+                u32 string count, u32 string data length
+string table    u32 end offset of each string, followed by the UTF-8 string data
+errors          u32 string index (NO_STRING if None)
+global keys     keys
+sections        u32 section count, then for each: u32 name index, keys
+keys            u32 key count, then for each: u32 name index, u32 value count, values
+value           u8 type, followed by
+                    NONE, TRUE, FALSE   nothing
+                    INT                 i64
+                    FLOAT               f64
+                    STRING, BIG_INT     u32 string index (BIG_INT is the decimal digits)
+</pre>
+Loading reads the buffer in place, for example a memory-mapped file,
+and decodes each distinct string only once.
+'''
+import struct
+
+MAGIC = b'PYINISNP'
+VERSION = 1
+NO_STRING = 0xffffffff
+
+NONE = 0
+TRUE = 1
+FALSE = 2
+INT = 3
+FLOAT = 4
+STRING = 5
+BIG_INT = 6
+
+HEADER = struct.Struct('<8sHHII')
+U32 = struct.Struct('<I')
+PAIR = struct.Struct('<II')
+TYPE = struct.Struct('<B')
+TYPE_INT = struct.Struct('<Bq')
+TYPE_FLOAT = struct.Struct('<Bd')
+TYPE_INDEX = struct.Struct('<BI')
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+
+def dump(data):
+    '''Convert parsed data to a snapshot.
+    @param data The parsed data tuple (global, sections, errors), see IniFile._export().
+    @returns Returns the snapshot as bytes.
+    '''
+    strings = {}
+    body = []
+
+    def index(string):
+        i = strings.get(string)
+        if(i is None):
+            i = len(strings)
+            strings[string] = i
+        return i
+
+    def keys(section):
+        body.append(U32.pack(len(section)))
+        for key, values in section.items():
+            body.append(PAIR.pack(index(key), len(values)))
+            for value in values:
+                if(value is None):
+                    body.append(TYPE.pack(NONE))
+                elif(value is True):
+                    body.append(TYPE.pack(TRUE))
+                elif(value is False):
+                    body.append(TYPE.pack(FALSE))
+                elif(isinstance(value, int)):
+                    if(value >= INT_MIN and value <= INT_MAX):
+                        body.append(TYPE_INT.pack(INT, value))
+                    else:
+                        body.append(TYPE_INDEX.pack(BIG_INT, index(str(value))))
+                elif(isinstance(value, float)):
+                    body.append(TYPE_FLOAT.pack(FLOAT, value))
+                elif(isinstance(value, str)):
+                    body.append(TYPE_INDEX.pack(STRING, index(value)))
+                else:
+                    raise Exception('snapshot: invalid value', value)
+
+    global_keys, sections, errors = data
+    body.append(U32.pack(NO_STRING if(errors is None) else index(errors)))
+    keys(global_keys)
+    body.append(U32.pack(len(sections)))
+    for name, section in sections.items():
+        body.append(U32.pack(index(name)))
+        keys(section)
+    encoded = [s.encode('utf-8', 'surrogatepass') for s in strings]
+    offsets = []
+    end = 0
+    for s in encoded:
+        end += len(s)
+        offsets.append(end)
+    out = [HEADER.pack(MAGIC, VERSION, 0, len(encoded), end),
+           struct.pack('<%dI' % len(offsets), *offsets)]
+    out.extend(encoded)
+    out.extend(body)
+    return b''.join(out)
+
+
+def load(buffer):
+    '''Convert a snapshot to parsed data.
+    @param buffer The snapshot as bytes or any bytes-like object, such as an mmap.
+    @returns Returns the parsed data tuple (global, sections, errors).
+    Raises Exception if the buffer is not a valid snapshot of this version.
+    '''
+    view = memoryview(buffer)
+    try:
+        magic, version, reserved, count, length = HEADER.unpack_from(view, 0)
+    except struct.error:
+        raise Exception('snapshot: invalid snapshot, too short')
+    if(magic != MAGIC):
+        raise Exception('snapshot: invalid snapshot, bad magic number')
+    if(version != VERSION):
+        raise Exception('snapshot: unsupported snapshot version', version)
+    try:
+        offset = HEADER.size
+        ends = struct.unpack_from('<%dI' % count, view, offset)
+        offset += 4 * count
+        # the end offsets must rise to the string data length
+        begin = 0
+        for end in ends:
+            if(end < begin):
+                raise Exception('snapshot: invalid snapshot, bad string table')
+            begin = end
+        if(begin != length or offset + length > len(view)):
+            raise Exception('snapshot: invalid snapshot, bad string table')
+        text = str(view[offset:offset + length], 'utf-8', 'surrogatepass')
+        offset += length
+        # the offsets are of the UTF-8 bytes, not the characters
+        if(len(text) != length):
+            data = bytes(view[offset - length:offset])
+            strings = []
+            begin = 0
+            for end in ends:
+                strings.append(str(data[begin:end], 'utf-8', 'surrogatepass'))
+                begin = end
+        else:
+            strings = []
+            begin = 0
+            for end in ends:
+                strings.append(text[begin:end])
+                begin = end
+
+        def keys(offset):
+            section = {}
+            (n,) = U32.unpack_from(view, offset)
+            offset += 4
+            for i in range(n):
+                name, count = PAIR.unpack_from(view, offset)
+                offset += 8
+                values = []
+                for j in range(count):
+                    kind = view[offset]
+                    if(kind == INT):
+                        values.append(TYPE_INT.unpack_from(view, offset)[1])
+                        offset += TYPE_INT.size
+                    elif(kind == FLOAT):
+                        values.append(TYPE_FLOAT.unpack_from(view, offset)[1])
+                        offset += TYPE_FLOAT.size
+                    elif(kind == STRING):
+                        values.append(strings[TYPE_INDEX.unpack_from(view, offset)[1]])
+                        offset += TYPE_INDEX.size
+                    elif(kind == BIG_INT):
+                        values.append(
+                            int(strings[TYPE_INDEX.unpack_from(view, offset)[1]]))
+                        offset += TYPE_INDEX.size
+                    elif(kind == NONE):
+                        values.append(None)
+                        offset += 1
+                    elif(kind == TRUE):
+                        values.append(True)
+                        offset += 1
+                    elif(kind == FALSE):
+                        values.append(False)
+                        offset += 1
+                    else:
+                        raise Exception('snapshot: invalid value type', kind)
+                section[strings[name]] = values
+            return section, offset
+
+        (errors,) = U32.unpack_from(view, offset)
+        offset += 4
+        errors = None if(errors == NO_STRING) else strings[errors]
+        global_keys, offset = keys(offset)
+        sections = {}
+        (n,) = U32.unpack_from(view, offset)
+        offset += 4
+        for i in range(n):
+            (name,) = U32.unpack_from(view, offset)
+            sections[strings[name]], offset = keys(offset + 4)
+        if(offset != len(view)):
+            raise Exception('snapshot: invalid snapshot, trailing data')
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise Exception('snapshot: invalid snapshot, truncated or corrupt')
+    finally:
+        view.release()
+    return global_keys, sections, errors
@@ -0,0 +1,285 @@
+''' @file python_ini/watcher.py
+@brief Hot reloading of an INI file, see IniWatcher.
+
+For example,
+<pre>
+watcher = IniWatcher('server.ini', debounce=0.1)
+watcher.start()
+...
+port = watcher.ini.get_section_values('server', 'port')
+...
+watcher.stop()
+</pre>
+The INI file is watched with inotify(7) where it is available (Linux)
+and otherwise by polling its os.stat() stamp. A burst of writes is parsed once,
+after the file has not changed for the debounce time.
+Each change is parsed into a new IniFile object in the watcher's thread.
+The new object is published, by a single reference assignment, only if the
+parse has no errors, so readers never wait for a parse and never see a partial one.
+'''
+import os
+import time
+import select
+import struct
+import threading
+from python_ini.ini_file import IniFile
+from python_ini.cache import file_stamp
+
+# the inotify(7) flags and event masks
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE)
+# struct inotify_event, followed by the name
+EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+    '''An inotify(7) watch of a directory, through ctypes.'''
+
+    def __init__(self, directory):
+        '''Inotify constructor.
+        @param directory The directory to watch. The directory is watched, rather than the file,
+        so that a file replaced by a rename is still watched.
+        Raises an Exception if inotify is not available.
+        '''
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if(self.fd < 0):
+            raise OSError(ctypes.get_errno(), 'inotify_init1() failed')
+        if(libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0):
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch() failed', directory)
+
+    def read(self):
+        '''Read the pending events.
+        @returns Returns the list of the file names, as bytes, of the events.
+        '''
+        names = []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while(offset + EVENT.size <= len(data)):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            names.append(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class IniWatcher:
+    '''Watches an INI file and publishes a new parse of it after every change.'''
+
+    def __init__(self, fname, values='s', engine='apg', lazy=False, interval=1.0,
+                 debounce=0.05, use_inotify=True, on_reload=None, on_error=None,
+                 publish_empty=False):
+        '''IniWatcher constructor.
+        @param fname The name of the INI file.
+        @param values The values mode of the IniFile objects, see IniFile().
+        @param engine The parsing engine, see IniFile().
+        @param lazy If True, the IniFile objects decode strings lazily, see IniFile().
+        @param interval The seconds between stat() polls if inotify is not used.
+        @param debounce The seconds to wait after a change until the file has not changed,
+        so that a burst of writes is parsed only once.
+        @param use_inotify If True, inotify(7) is used where it is available.
+        If False, or if it is not available, the file is polled.
+        @param on_reload If not None, a function, on_reload(ini), called in the watcher's
+        thread with each newly published IniFile object.
+        @param on_error If not None, a function, on_error(message), called in the watcher's
+        thread when the file cannot be read or has errors. The message is the errors display
+        or the exception. The previously published IniFile object is kept.
+        An exception raised by on_reload or on_error is counted as a failure and
+        its message kept in errors. The watcher goes on watching.
+        @param publish_empty If False (default), an empty (0 byte) file is not published
+        in place of a previously published parse, because a file may be seen empty
+        while it is being rewritten, between its truncation and the write.
+        It is a failure, reported to on_error, and the file is parsed again when it changes.
+        If True, an empty file is published as an empty parse.
+        '''
+        # validate the IniFile arguments
+        IniFile(values, engine=engine)
+        self.fname = fname
+        self.values = values
+        self.engine = engine
+        self.lazy = lazy
+        self.interval = interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.publish_empty = publish_empty
+        # 'inotify' or 'poll', set by start()
+        self.mode = None
+        # the number of published and of failed parses
+        self.reloads = 0
+        self.failures = 0
+        # the seconds from the change to the publishing of the last reload
+        self.latency = None
+        # the message of the last failed parse or callback
+        self.errors = None
+        self.__ini = None
+        # the stamp of the last parsed file
+        self.__stamp = None
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__notify = None
+        self.__wake = None
+
+    @property
+    def ini(self):
+        '''The IniFile object of the last parse without errors,
+        None if there has been none. The object is never changed by the watcher.'''
+        return self.__ini
+
+    def start(self):
+        '''Parse the file and start watching it in a background thread.
+        The first parse is done before returning.
+        @returns Returns the watcher.
+        '''
+        if(self.__thread is not None):
+            raise Exception('IniWatcher: already started')
+        self.__stop.clear()
+        self.mode = 'poll'
+        if(self.use_inotify):
+            try:
+                self.__notify = Inotify(os.path.dirname(os.path.abspath(self.fname)))
+                self.__wake = os.pipe()
+                self.mode = 'inotify'
+            except Exception:
+                # for example, not Linux
+                self.__notify = None
+        self.reload(time.perf_counter())
+        target = self.__watch_inotify if(self.__notify) else self.__watch_poll
+        self.__thread = threading.Thread(target=target, name='IniWatcher', daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        '''Stop watching the file. The last published IniFile object is kept.'''
+        if(self.__thread is None):
+            return
+        self.__stop.set()
+        if(self.__wake):
+            os.write(self.__wake[1], b'x')
+        self.__thread.join()
+        self.__thread = None
+        if(self.__notify):
+            self.__notify.close()
+            self.__notify = None
+            os.close(self.__wake[0])
+            os.close(self.__wake[1])
+            self.__wake = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reload(self, changed=None):
+        '''Parse the file and publish the result if it has no errors.
+        Called by the watcher's thread, but may also be called directly.
+        @param changed The time.perf_counter() time of the change, for the latency.
+        @returns Returns True if a new IniFile object is published.
+        '''
+        if(changed is None):
+            changed = time.perf_counter()
+        stamp = None
+        try:
+            # the stamp is taken before the file is read, see FileCache.stamp()
+            stamp = file_stamp(self.fname)
+            if(stamp[1] == 0 and self.__ini is not None and not self.publish_empty):
+                errors = 'IniWatcher: empty file, the previous parse is kept'
+            else:
+                ini = IniFile(self.values, engine=self.engine, lazy=self.lazy)
+                ini.parse(self.fname)
+                errors = ini.errors
+        except Exception as e:
+            errors = str(e)
+        # a file is parsed again only after it changes
+        self.__stamp = stamp
+        if(errors):
+            self.failures += 1
+            self.errors = errors
+            self.__callback(self.on_error, errors)
+            return False
+        # the swap, readers have either the old or the new object
+        self.__ini = ini
+        self.latency = time.perf_counter() - changed
+        self.reloads += 1
+        self.__callback(self.on_reload, ini)
+        return True
+
+    def __callback(self, function, argument):
+        # a failing user callback must not stop the watcher's thread
+        if(function is None):
+            return
+        try:
+            function(argument)
+        except Exception as e:
+            self.failures += 1
+            self.errors = 'IniWatcher: callback failed: %r' % (e,)
+
+    def __changed(self):
+        # True if the file has changed since it was last parsed
+        try:
+            return file_stamp(self.fname) != self.__stamp
+        except OSError:
+            # a missing file is a change once
+            return self.__stamp is not None
+
+    def __watch_poll(self):
+        while(not self.__stop.wait(self.interval)):
+            if(not self.__changed()):
+                continue
+            changed = time.perf_counter()
+            # wait until the stamp is the same for the debounce time
+            stamp = None
+            while(not self.__stop.wait(self.debounce)):
+                try:
+                    current = file_stamp(self.fname)
+                except OSError:
+                    current = None
+                if(current == stamp):
+                    break
+                stamp = current
+            else:
+                return
+            self.reload(changed)
+
+    def __watch_inotify(self):
+        name = os.fsencode(os.path.basename(self.fname))
+        fds = [self.__notify.fd, self.__wake[0]]
+        while(True):
+            select.select(fds, [], [], None)
+            if(self.__stop.is_set()):
+                return
+            if(name not in self.__notify.read()):
+                continue
+            changed = time.perf_counter()
+            # wait until there are no events for the debounce time
+            last = changed
+            while(True):
+                timeout = last + self.debounce - time.perf_counter()
+                if(timeout <= 0 or not select.select(fds, [], [], timeout)[0]):
+                    break
+                if(self.__stop.is_set()):
+                    return
+                if(name in self.__notify.read()):
+                    last = time.perf_counter()
+            if(self.__changed()):
+                self.reload(changed)
@@ -0,0 +1,345 @@
+''' @file tests/differential.py
+@brief Differential conformance harness for the IniFile parsing engines.
+
+Random INI files are generated from the productions in python_ini/grammar.abnf,
+including the error productions, bad-section-line, bad-value-line and bad-blank-line,
+and the good and bad u_* UDT escapes. Each file is parsed by every engine
+and the results of get_keys()/get_values(), get_sections(), get_section_keys(),
+get_section_values() and display_errors() are required to be identical.
+
+Run from the project directory, for example
+<pre>
+python3 -m tests.differential --count 2000 --seed 7 --shrink --bench
+</pre>
+'''
+import sys
+import os
+import random
+import time
+import argparse
+# add the current working directory to the path
+# DO NOT MOVE THE FOLLOWING STATEMENT
+# if using autopep8 formatter, for example, set argument '--ignore=E402'
+sys.path.append(os.getcwd())
+import io
+from python_ini.ini_file import IniFile
+
+# the engines to compare, name: IniFile() keyword arguments
+# with 'chunk_size' the input is parsed from a file handle in chunks of that size
+ENGINES = {
+    'apg': {'engine': 'apg'},
+    'fast': {'engine': 'fast'},
+    'apg-chunked': {'engine': 'apg', 'chunk_size': 5},
+    'fast-chunked': {'engine': 'fast', 'chunk_size': 5},
+    'apg-lazy': {'engine': 'apg', 'lazy': True},
+    'fast-lazy': {'engine': 'fast', 'lazy': True},
+    'apg-editable': {'engine': 'apg', 'editable': True},
+    'fast-editable': {'engine': 'fast', 'editable': True},
+}
+
+NAME_CHARS = 'aAzZ09!$%&()*+-.<>?@^_{|}~'
+STRING_CHARS = 'aZ09!$%&()*+-.<>?@[]^_`{|}~'
+QUOTED_CHARS = ' aZ09!#$%&()*+,-./:;<=>?@[]^_`{|}~'
+ESCAPES = ['\\\\', '\\/', '\\"', '\\#', "\\'", '\\,', '\\:', '\\;', '\\=',
+           '\\b', '\\t', '\\n', '\\r', '\\x41', '\\xfF', '\\xG0',
+           '\\u0041', '\\uFFFD', '\\U0001F600', '\\U0010ffff']
+BAD_ESCAPES = ['\\q', '\\B', '\\xg1', '\\x4', '\\u12z4', '\\ud800',
+               '\\U0000d7fg', '\\U0000dfff', '\\U00110000', '\\']
+NOISE = [' ', '\t', '/', '\\', '"', "'", ',', '=', ':', ';', '#', '[', ']',
+         '\n', '\r', '\r\n', '\xe9', '\x0c', 'on', '1', '.']
+
+
+class Generator:
+    '''Generates random INI files from the grammar productions.'''
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def pick(self, items):
+        return self.rng.choice(items)
+
+    def chance(self, p):
+        return self.rng.random() < p
+
+    def chars(self, chars, lo=1, hi=6):
+        return ''.join(self.pick(chars)
+                       for i in range(self.rng.randint(lo, hi)))
+
+    def line_end(self):
+        return self.pick(['\n', '\n', '\n', '\r\n', '\r'])
+
+    def line_continue(self):
+        # line-continue = %d47 *any line-end *(%d32 / %d9)
+        out = '/'
+        if(self.chance(0.5)):
+            out += self.pick([' comment', '# c', ' a/b'])
+        return out + self.line_end() + self.pick(['', ' ', '\t ', '  '])
+
+    def owsp(self):
+        out = self.pick(['', '', ' ', '\t', '   '])
+        if(self.chance(0.05)):
+            out += self.line_continue()
+        return out
+
+    def wsp(self):
+        return self.pick([' ', '\t', '  ']) + self.owsp()
+
+    def comment(self):
+        if(self.chance(0.7)):
+            return ''
+        return self.pick([';', '#']) + self.pick(['', ' comment', ' a/b', ';#'])
+
+    def name(self):
+        return self.chars(NAME_CHARS, 1, 5)
+
+    def escaped(self):
+        if(self.chance(0.1)):
+            return self.pick(BAD_ESCAPES)
+        return self.pick(ESCAPES)
+
+    def string_body(self, chars):
+        out = ''
+        for i in range(self.rng.randint(1, 5)):
+            if(self.chance(0.2)):
+                out += self.escaped()
+            else:
+                out += self.pick(chars)
+        return out
+
+    def value(self):
+        kind = self.rng.randint(0, 9)
+        if(kind == 0):
+            return self.pick(['', '+', '-']) + self.chars('0123456789', 1, 4)
+        if(kind == 1):
+            return self.pick(['', '+', '-']) + self.pick(
+                ['1.', '2.5', '.5', '3e4', '1.5E-2', '6.e+1', '1.2.3'])
+        if(kind == 2):
+            word = self.pick(['true', 'yes', 'on', 'false', 'no', 'off',
+                              'null', 'void', 'none'])
+            if(self.chance(0.5)):
+                word = word.upper()
+            if(self.chance(0.1)):
+                word += self.pick(['x', 'e', '1'])
+            return word
+        if(kind == 3):
+            return '"' + self.string_body(QUOTED_CHARS.replace('"', "'")) + '"'
+        if(kind == 4):
+            return "'" + self.string_body(QUOTED_CHARS) + "'"
+        if(kind == 5 and self.chance(0.2)):
+            return self.pick(['""', "''", '"open', "'open"])
+        return self.string_body(STRING_CHARS)
+
+    def value_line(self):
+        # good-value = key-name [key-delim [value-array]] owsp [comment] line-end
+        out = self.name()
+        if(self.chance(0.9)):
+            out += self.pick([self.owsp() + '=' + self.owsp(),
+                              self.owsp() + ':' + self.owsp(),
+                              self.wsp()])
+            if(self.chance(0.9)):
+                out += self.value()
+                for i in range(self.rng.randint(0, 3)):
+                    out += self.pick([self.owsp() + ',' + self.owsp(),
+                                      self.wsp()])
+                    out += self.value()
+        return out + self.owsp() + self.comment()
+
+    def section_line(self):
+        # good-section-line = %d91 owsp section-name owsp %d93 owsp [comment] line-end
+        return '[' + self.owsp() + self.name() + self.owsp() + ']' + \
+            self.owsp() + self.comment()
+
+    def blank_line(self):
+        return self.pick(['', ' ', '\t']) + self.comment()
+
+    def bad_line(self):
+        return self.pick([
+            # bad-section-line
+            '[' + self.pick(['', 'sec', ' sec ] x', 'a b]', 'sec[]']),
+            # bad-value-line
+            self.pick(['"', '=', ',', "'", ']']) + self.name(),
+            self.name() + self.pick([' = ,', ' == 1', ' = 1 2,', '[1]']),
+            # bad-blank-line
+            self.pick([' ', '\t']) + self.name() + self.pick(['', ' = 1']),
+        ])
+
+    def mutate(self, text):
+        index = self.rng.randint(0, len(text))
+        return text[:index] + self.pick(NOISE) + text[index:]
+
+    def ini_file(self, lines=12):
+        out = ''
+        for i in range(self.rng.randint(1, lines)):
+            kind = self.rng.randint(0, 9)
+            if(kind < 5):
+                line = self.value_line()
+            elif(kind < 7):
+                line = self.section_line()
+            elif(kind < 8):
+                line = self.blank_line()
+            else:
+                line = self.bad_line()
+            out += line + self.line_end()
+        if(self.chance(0.3)):
+            # no line end on the last line
+            out = out.rstrip('\r\n')
+        for i in range(self.rng.randint(0, 2)):
+            out = self.mutate(out)
+        return out
+
+
+def new_ini(text, values, kwargs):
+    '''Construct the IniFile object and the parse() arguments for an engine.'''
+    kwargs = dict(kwargs)
+    chunk_size = kwargs.pop('chunk_size', None)
+    if(chunk_size and text):
+        # an empty fstr is "no input", keep the same result for all engines
+        parse_args = {'fhandle': io.StringIO(text, newline=''),
+                      'chunk_size': chunk_size}
+    else:
+        parse_args = {'fstr': text}
+    return IniFile(values, **kwargs), parse_args
+
+
+def result(text, values, kwargs):
+    '''Parse the text and collect everything the getters report.
+    @returns Returns a printable string of the results.
+    '''
+    ini, parse_args = new_ini(text, values, kwargs)
+    try:
+        ini.parse(**parse_args)
+    except Exception as e:
+        return repr(('exception', str(e)))
+    keys = []
+    for key in ini.get_keys():
+        keys.append((key, ini.get_values(key)))
+    sections = []
+    for section in ini.get_sections():
+        section_keys = []
+        for key in ini.get_section_keys(section):
+            section_keys.append(
+                (key, ini.get_section_values(section, key)))
+        sections.append((section, section_keys))
+    return repr((keys, sections, ini.display_errors()))
+
+
+def differs(text, engines=ENGINES):
+    '''Compare the results of all engines.
+    @param text The INI file text.
+    @param engines The engines to compare.
+    @returns Returns None if all results are identical,
+    otherwise a dictionary of results by engine name.
+    '''
+    for values in ['s', 'm']:
+        results = {}
+        for name, kwargs in engines.items():
+            results[name] = result(text, values, kwargs)
+        if(len(set(results.values())) > 1):
+            results['values'] = values
+            return results
+    return None
+
+
+def shrink(text, engines=ENGINES):
+    '''Shrink a failing input to a minimal counterexample.
+    First whole lines and then single characters are removed
+    for as long as the engines still disagree.
+    @param text A failing INI file text.
+    @returns Returns the shrunken INI file text.
+    '''
+    lines = text.splitlines(True)
+    i = 0
+    while(i < len(lines)):
+        trial = ''.join(lines[:i] + lines[i + 1:])
+        if(differs(trial, engines)):
+            lines = lines[:i] + lines[i + 1:]
+        else:
+            i += 1
+    text = ''.join(lines)
+    i = 0
+    while(i < len(text)):
+        trial = text[:i] + text[i + 1:]
+        if(differs(trial, engines)):
+            text = trial
+        else:
+            i += 1
+    return text
+
+
+def bench(texts, engines=ENGINES, values='s'):
+    '''Time each engine over all of the texts.
+    @returns Returns a dictionary of total seconds by engine name.
+    '''
+    times = {}
+    for name, kwargs in engines.items():
+        start = time.perf_counter()
+        for text in texts:
+            ini, parse_args = new_ini(text, values, kwargs)
+            try:
+                ini.parse(**parse_args)
+            except Exception:
+                pass
+        times[name] = time.perf_counter() - start
+    return times
+
+
+def run(count=1000, seed=1, lines=12, do_shrink=False, engines=ENGINES):
+    '''Generate and compare count random INI files.
+    @returns Returns a tuple of the list of failures and the list of generated texts.
+    Each failure is a dictionary with the input, the shrunken input (if requested)
+    and the results by engine name.
+    '''
+    gen = Generator(random.Random(seed))
+    failures = []
+    texts = []
+    for i in range(count):
+        text = gen.ini_file(lines)
+        texts.append(text)
+        results = differs(text, engines)
+        if(results):
+            failure = {'input': text, 'results': results}
+            if(do_shrink):
+                failure['shrunk'] = shrink(text, engines)
+                failure['results'] = differs(failure['shrunk'], engines)
+            failures.append(failure)
+    return failures, texts
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description='Differential conformance test of the IniFile engines.')
+    ap.add_argument('--count', type=int, default=1000,
+                    help='number of random INI files')
+    ap.add_argument('--seed', type=int, default=1, help='random seed')
+    ap.add_argument('--lines', type=int, default=12,
+                    help='maximum lines per INI file')
+    ap.add_argument('--shrink', action='store_true',
+                    help='shrink failing inputs to a minimal counterexample')
+    ap.add_argument('--bench', action='store_true',
+                    help='report the parse times of each engine')
+    args = ap.parse_args()
+    failures, texts = run(args.count, args.seed, args.lines, args.shrink)
+    print('equivalence: %d of %d inputs differ' % (len(failures), len(texts)))
+    for failure in failures:
+        print()
+        print('input: ' + repr(failure['input']))
+        if(failure.get('shrunk') is not None):
+            print('shrunk: ' + repr(failure['shrunk']))
+        for name, value in failure['results'].items():
+            print('%12s: %s' % (name, value))
+    if(args.bench):
+        print()
+        print('benchmark: %d inputs, %d characters' %
+              (len(texts), sum(len(t) for t in texts)))
+        times = bench(texts)
+        base = times.get('apg')
+        for name, seconds in times.items():
+            line = '%12s: %9.4f sec' % (name, seconds)
+            if(base and seconds):
+                line += '  x%.1f' % (base / seconds)
+            print(line)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
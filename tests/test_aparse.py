@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+import io
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import python_ini.ini_file as ini_file
+from python_ini.ini_file import IniFile
+from python_ini.cache import FileCache
+from tests.test_fast import ini_result
+
+
+class TestAparse(unittest.TestCase):
+    """Test the asyncio parse."""
+
+    fname = 'tests/data/sections.ini'
+
+    def expected(self, values='s', **kwargs):
+        ini = IniFile(values)
+        ini.parse(**kwargs)
+        return ini_result(ini)
+
+    def test_aparse_1(self):
+        '''File names, strings and file handles.'''
+        async def main():
+            ini = IniFile()
+            await ini.aparse(self.fname)
+            self.assertEqual(ini_result(ini), self.expected(fname=self.fname))
+            await ini.aparse(fstr='a = 1\n[bad\n')
+            self.assertEqual(ini_result(ini), self.expected(fstr='a = 1\n[bad\n'))
+            await ini.aparse(fhandle=io.StringIO('b = 2\n'), chunk_size=2)
+            self.assertEqual(ini.get_values('b'), 2)
+            with self.assertRaises(FileNotFoundError):
+                await ini.aparse('tests/data/missing.ini')
+            with self.assertRaises(Exception):
+                await ini.aparse()
+            # the file cache
+            cache = FileCache()
+            ini = IniFile(file_cache=cache)
+            await ini.aparse(self.fname)
+            await ini.aparse(self.fname)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertEqual(ini_result(ini), self.expected(fname=self.fname))
+        asyncio.run(main())
+
+    def test_aparse_2(self):
+        '''Concurrent parses of the same file are coalesced.'''
+        async def main():
+            inis = [IniFile('m') for i in range(5)] + [IniFile('s')]
+            with mock.patch.object(ini_file, 'parse_file', wraps=ini_file.parse_file) as worker:
+                await asyncio.gather(*[ini.aparse(self.fname) for ini in inis])
+                self.assertEqual(worker.call_count, 2)
+                await asyncio.gather(*[ini.aparse(self.fname) for ini in inis[:2]])
+                self.assertEqual(worker.call_count, 3)
+            expected = self.expected('m', fname=self.fname)
+            for ini in inis[:5]:
+                self.assertEqual(ini_result(ini), expected)
+            self.assertEqual(ini_result(inis[5]), self.expected(fname=self.fname))
+            # each object has its own copy
+            inis[0].get_section_values('SECTION1', 'key11').append(0)
+            self.assertEqual(ini_result(inis[1]), expected)
+            self.assertEqual(ini_file.IN_FLIGHT, {})
+            # errors are raised for every caller
+            results = await asyncio.gather(
+                *[ini.aparse('tests/data/missing.ini') for ini in inis],
+                return_exceptions=True)
+            for result in results:
+                self.assertIsInstance(result, FileNotFoundError)
+        asyncio.run(main())
+
+    def test_aparse_3(self):
+        '''The event loop runs during a parse.'''
+        fstr = ''.join('key%d = %d, "value\\x41"\n' % (i, i) for i in range(2000))
+
+        async def main():
+            ticks = []
+
+            async def ticker():
+                while(True):
+                    ticks.append(1)
+                    await asyncio.sleep(0.001)
+            task = asyncio.ensure_future(ticker())
+            await asyncio.sleep(0)
+            ini = IniFile()
+            with ThreadPoolExecutor(1) as executor:
+                await ini.aparse(fstr=fstr, executor=executor)
+            task.cancel()
+            self.assertEqual(ini.get_values('key1999'), 'value\x41')
+            self.assertGreater(len(ticks), 2)
+        asyncio.run(main())
+
+    def test_aparse_4(self):
+        '''Process executors.'''
+        async def main():
+            with ProcessPoolExecutor(1) as executor:
+                ini = IniFile('m', engine='fast')
+                await ini.aparse(self.fname, executor=executor)
+                self.assertEqual(ini_result(ini), self.expected('m', fname=self.fname))
+                await ini.aparse(fstr='a = 1, 2\n', executor=executor)
+                self.assertEqual(ini.get_values('a'), [1, 2])
+                with self.assertRaises(Exception):
+                    await ini.aparse(fhandle=io.StringIO('a = 1\n'), executor=executor)
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
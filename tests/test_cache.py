@@ -0,0 +1,138 @@
+import unittest
+import os
+import tempfile
+import shutil
+from unittest import mock
+import python_ini.cache as cache_module
+from python_ini.ini_file import IniFile
+from python_ini.cache import ParseCache, FileCache
+from tests.test_fast import ini_result
+
+
+class TestParseCache(unittest.TestCase):
+    """Test the content-hash parse cache."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_cache_1(self):
+        '''Memory cache hits.'''
+        fname = 'tests/data/sections.ini'
+        cache = ParseCache()
+        ini = IniFile('m')
+        ini.parse(fname)
+        first = IniFile('m', cache=cache)
+        first.parse(fname)
+        second = IniFile('m', cache=cache)
+        second.parse(fname)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(ini_result(first), ini_result(ini))
+        self.assertEqual(ini_result(second), ini_result(ini))
+        # the same content as a string, with errors
+        second.parse(fstr='a = 1\n[bad\n')
+        self.assertIn('bad section', second.display_errors())
+        first.parse(fstr=b'a = 1\n[bad\n')
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(ini_result(first), ini_result(second))
+        # cached data is not shared
+        first.get_values('a').append(2)
+        self.assertEqual(second.get_values('a'), [1])
+
+    def test_parse_cache_2(self):
+        '''LRU eviction.'''
+        cache = ParseCache(size=2)
+        ini = IniFile(cache=cache)
+        for fstr in ['a = 1', 'a = 2', 'a = 3', 'a = 3', 'a = 1']:
+            ini.parse(fstr=fstr)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertEqual(ini.get_values('a'), 1)
+
+    def test_parse_cache_3(self):
+        '''Disk cache.'''
+        ini = IniFile(cache=ParseCache(directory=self.directory))
+        ini.parse(fstr='a = 1, "x"\n')
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        cache = ParseCache(directory=self.directory)
+        ini = IniFile('m', cache=cache)
+        ini.parse(fstr='a = 1, "x"\n')
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertEqual(ini.get_values('a'), [1, 'x'])
+        # unreadable entries are misses
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'wb') as fd:
+                fd.write(b'\xff')
+        cache = ParseCache(directory=self.directory)
+        ini = IniFile('m', cache=cache)
+        ini.parse(fstr='a = 1, "x"\n')
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(ini.get_values('a'), [1, 'x'])
+
+    def test_parse_cache_4(self):
+        '''The key depends on the data format and the package version.'''
+        cache = ParseCache()
+        key = cache.key('a = 1')
+        self.assertTrue(cache_module.VERSION.startswith('%d ' % cache_module.FORMAT))
+        with mock.patch.object(cache_module, 'VERSION', '0 1.0.0'):
+            self.assertNotEqual(cache.key('a = 1'), key)
+        self.assertEqual(cache.key(b'a = 1'), key)
+
+
+class TestFileCache(unittest.TestCase):
+    """Test the stat-validated file cache."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, fname, text, mtime_ns):
+        with open(fname, 'w') as fd:
+            fd.write(text)
+        os.utime(fname, ns=(mtime_ns, mtime_ns))
+
+    def test_file_cache_1(self):
+        '''Unchanged files are not parsed again.'''
+        fname = os.path.join(self.directory, 'a.ini')
+        self.write(fname, 'a = 1\n', 10**18)
+        cache = FileCache()
+        ini = IniFile(file_cache=cache)
+        for mmap in [False, True, False]:
+            ini.parse(fname, mmap=mmap)
+            self.assertEqual(ini.get_values('a'), 1)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        # changed modification time or size
+        self.write(fname, 'a = 2\n', 2 * 10**18)
+        ini.parse(fname)
+        self.assertEqual(ini.get_values('a'), 2)
+        self.write(fname, 'a = 33\n', 2 * 10**18)
+        ini.parse(fname)
+        self.assertEqual(ini.get_values('a'), 33)
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        # invalidate
+        self.assertTrue(cache.invalidate(fname))
+        self.assertFalse(cache.invalidate(fname))
+        ini.parse(fname)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        with self.assertRaises(FileNotFoundError):
+            ini.parse(os.path.join(self.directory, 'missing.ini'))
+
+    def test_file_cache_2(self):
+        '''LRU eviction and the content cache.'''
+        fnames = [os.path.join(self.directory, name) for name in 'abc']
+        for fname in fnames:
+            self.write(fname, 'a = 1\n', 10**18)
+        cache = FileCache(size=2)
+        parse_cache = ParseCache()
+        ini = IniFile(file_cache=cache, cache=parse_cache)
+        for i in [0, 1, 2, 2, 0]:
+            ini.parse(fnames[i])
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+        self.assertEqual((parse_cache.hits, parse_cache.misses), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
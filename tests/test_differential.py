@@ -0,0 +1,39 @@
+import unittest
+from unittest import mock
+import random
+import tests.differential as differential
+
+
+class TestDifferential(unittest.TestCase):
+    """Test the equivalence of the parsing engines."""
+
+    def test_differential_1(self):
+        '''Random grammar-generated inputs.'''
+        for seed in [1, 2, 3]:
+            failures, texts = differential.run(count=100, seed=seed)
+            self.assertEqual(len(texts), 100)
+            self.assertEqual(failures, [])
+
+    def test_differential_2(self):
+        '''The generator covers the error productions and escapes.'''
+        gen = differential.Generator(random.Random(1))
+        text = ''.join(gen.ini_file() for i in range(200))
+        for s in ['[', '/', '\\u', '\\U', '\\x', '"', "'", '\r\n']:
+            self.assertIn(s, text)
+
+    def test_differential_3(self):
+        '''Shrinking a failing input.'''
+        def differs(text, engines=None):
+            return 'X' in text and '[' in text
+        with mock.patch.object(differential, 'differs', differs):
+            shrunk = differential.shrink('key = 1\n[sec] X\nkey2 = 2\n')
+        self.assertEqual(shrunk, '[X')
+
+    def test_differential_4(self):
+        '''Benchmark report.'''
+        times = differential.bench(['key = 1\n'])
+        self.assertEqual(set(times), set(differential.ENGINES))
+
+
+if __name__ == '__main__':
+    unittest.main()
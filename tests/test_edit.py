@@ -0,0 +1,182 @@
+import unittest
+from unittest import mock
+import random
+from python_ini.ini_file import IniFile
+import python_ini.edit_index as edit_index
+from python_ini.edit_index import split_lines, EditIndex
+from tests.differential import Generator
+from tests.test_fast import ini_result
+
+
+class TestEdit(unittest.TestCase):
+    """Test the incremental re-parse of edited lines."""
+
+    fstr = ('a = 1\n[s]\nb = 2\nc = x, /\n  y\n[t]\nb = 3\n[s]\nd\n')
+
+    def parses(self, text):
+        # the generated text may have characters that the parser rejects
+        try:
+            IniFile().parse(fstr=text)
+        except Exception:
+            return False
+        return True
+
+    def check(self, ini, text, values='m', engine='apg'):
+        full = IniFile(values, engine=engine)
+        full.parse(fstr=text)
+        self.assertEqual(ini_result(ini), ini_result(full))
+
+    def test_edit_1(self):
+        '''Only the changed logical lines are parsed.'''
+        for engine in ['apg', 'fast']:
+            ini = IniFile('m', engine=engine, editable=True)
+            ini.parse(fstr=self.fstr)
+            self.check(ini, self.fstr, engine=engine)
+            # replace a value
+            self.assertEqual(ini.apply_edit(3, 3, 'b = 22\n'), 1)
+            self.assertEqual(ini.get_section_values('s', 'b'), [22])
+            # the continued line is parsed whole
+            self.assertEqual(ini.apply_edit(5, 5, '  z\n'), 2)
+            self.assertEqual(ini.get_section_values('s', 'c'), ['x', 'z'])
+            # insert a section, the following keys move to it
+            self.assertEqual(ini.apply_edit(3, 2, '[new]\n'), 1)
+            text = 'a = 1\n[s]\n[new]\nb = 22\nc = x, /\n  z\n[t]\nb = 3\n[s]\nd\n'
+            self.check(ini, text, engine=engine)
+            self.assertEqual(ini.get_sections(), ['s', 'new', 't'])
+            self.assertEqual(ini.get_section_keys('s'), ['d'])
+            # delete it again, with errors after the edit
+            ini.apply_edit(3, 3, '')
+            ini.apply_edit(10, 9, '[bad\nbad line\n')
+            text = 'a = 1\n[s]\nb = 22\nc = x, /\n  z\n[t]\nb = 3\n[s]\nd\n[bad\nbad line\n'
+            self.check(ini, text, engine=engine)
+            ini.apply_edit(1, 1, 'x = 0\ny = 0\n')
+            self.check(ini, 'x = 0\ny = 0\n' + text[6:], engine=engine)
+            self.assertIn('line: 12', ini.display_errors())
+
+    def test_edit_2(self):
+        '''Joined lines and line ends.'''
+        ini = IniFile('m', editable=True)
+        ini.parse(fstr='a = 1\r\nb = 2\n[s]')
+        # the new text runs on to the next line
+        ini.apply_edit(1, 1, 'a = 1, ')
+        self.check(ini, 'a = 1, b = 2\n[s]')
+        # append to the last line, which has no line end
+        ini.apply_edit(3, 2, ' ; comment\nc = 3')
+        self.check(ini, 'a = 1, b = 2\n[s] ; comment\nc = 3')
+        # a carriage return and a line feed become one line end
+        ini.apply_edit(2, 2, 'd = 4\r')
+        ini.apply_edit(3, 3, '\nc = 3')
+        self.check(ini, 'a = 1, b = 2\nd = 4\r\nc = 3')
+        # a line continuation
+        ini.apply_edit(2, 2, 'd = 4, /\n')
+        self.check(ini, 'a = 1, b = 2\nd = 4, /\nc = 3')
+
+    def test_edit_3(self):
+        '''Random edits are the same as parsing the edited file.'''
+        rng = random.Random(1)
+        gen = Generator(rng)
+        for i in range(40):
+            values = rng.choice('sm')
+            engine = rng.choice(['apg', 'fast'])
+            text = gen.ini_file(16)
+            if(not self.parses(text)):
+                continue
+            ini = IniFile(values, engine=engine, editable=True)
+            ini.parse(fstr=text)
+            for j in range(6):
+                lines = split_lines(text)
+                start = rng.randint(1, len(lines) + 1)
+                end = rng.randint(start - 1, min(len(lines), start + 2))
+                new = gen.ini_file(3) if(rng.random() < 0.8) else ''
+                edited = ''.join(lines[:start - 1]) + new + ''.join(lines[end:])
+                if(not edited or not self.parses(edited)):
+                    continue
+                text = edited
+                ini.apply_edit(start, end, new)
+                self.check(ini, text, values, engine)
+
+    def test_edit_4(self):
+        '''Invalid edits.'''
+        ini = IniFile()
+        ini.parse(fstr='a = 1\n')
+        with self.assertRaises(Exception):
+            ini.apply_edit(1, 1, 'a = 2\n')
+        ini = IniFile(editable=True)
+        ini.parse(fstr=b'a = 1\nb = 2\n')
+        for start, end in [(0, 1), (1, 3), (4, 3), (2, 0)]:
+            with self.assertRaises(Exception):
+                ini.apply_edit(start, end, '')
+        # a failed parse changes nothing
+        with self.assertRaises(Exception):
+            ini.apply_edit(1, 1, 'a = \xe9\n')
+        self.assertEqual(ini.get_values('a'), 1)
+        ini.apply_edit(3, 2, b'c = 3\n')
+        self.assertEqual(ini.get_keys(), ['a', 'b', 'c'])
+        ini.load_snapshot(ini.dump_snapshot())
+        with self.assertRaises(Exception):
+            ini.apply_edit(1, 1, '')
+
+
+    def test_edit_5(self):
+        '''Keys moved across a section line.'''
+        for engine in ['apg', 'fast']:
+            # a key before a new section line, the old key moves into the section
+            ini = IniFile('m', engine=engine, editable=True)
+            ini.parse(fstr='a = 0\nk = 1\n')
+            ini.apply_edit(2, 1, 'k = 5\n[s]\n')
+            self.check(ini, 'a = 0\nk = 5\n[s]\nk = 1\n', engine=engine)
+            self.assertEqual(ini.get_values('k'), [5])
+            self.assertEqual(ini.get_section_values('s', 'k'), [1])
+            # a new section in the middle of the global keys
+            text = 'a = 1\nb = 2\nc = 3\n[t]\nb = 4\n'
+            ini = IniFile('m', engine=engine, editable=True)
+            ini.parse(fstr=text)
+            ini.apply_edit(2, 1, '[t]\n')
+            self.check(ini, 'a = 1\n[t]\nb = 2\nc = 3\n[t]\nb = 4\n', engine=engine)
+            self.assertEqual(ini.get_keys(), ['a'])
+            self.assertEqual(ini.get_section_keys('t'), ['b', 'c'])
+            # and removed again, the keys move back in their order
+            ini.apply_edit(2, 2, '')
+            self.check(ini, text, engine=engine)
+            self.assertEqual(ini.get_keys(), ['a', 'b', 'c'])
+
+    def test_edit_6(self):
+        '''A failed edit leaves the parse of the text before the edit.'''
+        text = 'a = 1\n[s]\nb = 2\n[bad\nc = 3\n'
+        ini = IniFile('m', editable=True)
+        ini.parse(fstr=text)
+        update = EditIndex.update
+        failures = []
+
+        def fail_once(index):
+            # fail the edit, but not the rebuild after it
+            if(not failures):
+                failures.append(index)
+                raise ValueError('update')
+            update(index)
+        with mock.patch.object(EditIndex, 'update', fail_once):
+            with self.assertRaises(ValueError):
+                ini.apply_edit(2, 2, '[t]\n')
+        self.assertEqual(len(failures), 1)
+        self.check(ini, text)
+        ini.apply_edit(2, 2, '[t]\n')
+        self.check(ini, 'a = 1\n[t]\nb = 2\n[bad\nc = 3\n')
+
+    def test_edit_7(self):
+        '''Many records, in many blocks.'''
+        rng = random.Random(2)
+        with mock.patch.object(edit_index, 'BLOCK', 2):
+            lines = ['k%d = %d\n' % (i, i) if(i % 7) else '[s%d]\n' % (i % 3) for i in range(60)]
+            ini = IniFile('m', engine='fast', editable=True)
+            ini.parse(fstr=''.join(lines))
+            for i in range(60):
+                start = rng.randint(1, len(lines) + 1)
+                end = rng.randint(start - 1, min(len(lines), start + 4))
+                new = [rng.choice(['[s0]\n', '[bad\n', 'k%d = %d\n' % (i, i)])
+                       for j in range(rng.randint(0, 4))]
+                lines[start - 1:end] = new
+                ini.apply_edit(start, end, ''.join(new))
+                self.check(ini, ''.join(lines), engine='fast')
+
+if __name__ == '__main__':
+    unittest.main()
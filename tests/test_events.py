@@ -0,0 +1,99 @@
+import unittest
+import io
+import random
+from python_ini.ini_file import IniFile
+from tests.differential import Generator
+
+
+def from_events(events):
+    '''Rebuild the multi-valued keys, sections and error display from the events.'''
+    keys = {}
+    sections = {}
+    display = ''
+    for event in events:
+        if(isinstance(event, dict)):
+            display += '{line: %d, message: %s}\n' % (
+                event['line'], event['message'])
+            continue
+        section, key, values, line_no = event
+        if(section is None):
+            keys.setdefault(key, []).extend(values)
+        elif(key is None):
+            sections.setdefault(section, {})
+        else:
+            sections[section].setdefault(key, []).extend(values)
+    # an empty list of values is a "true" flag
+    for key in keys:
+        keys[key] = keys[key] or [True]
+    for section in sections.values():
+        for key in section:
+            section[key] = section[key] or [True]
+    return keys, sections, display or None
+
+
+def from_parse(ini):
+    keys = {}
+    for key in ini.get_keys():
+        keys[key] = ini.get_values(key)
+    sections = {}
+    for section in ini.get_sections():
+        sections[section] = {}
+        for key in ini.get_section_keys(section):
+            sections[section][key] = ini.get_section_values(section, key)
+    return keys, sections, ini.display_errors()
+
+
+class TestEvents(unittest.TestCase):
+    """Test the incremental event parser."""
+
+    def test_events_1(self):
+        '''Events for keys, sections and errors.'''
+        ini = IniFile()
+        events = list(ini.iter_events(
+            fstr='g = 1\n[a]\nk = 1, 2/\n 3\n  bad\nj\n'))
+        self.assertEqual(events[0], (None, 'g', [1], 1))
+        self.assertEqual(events[1], ('a', None, [], 2))
+        self.assertEqual(events[2], ('a', 'k', [1, 2, 3], 3))
+        self.assertEqual(events[3]['message'],
+                         'invalid blank line, only white space and comments allowed')
+        self.assertEqual(events[4][:3], ('a', 'j', []))
+        self.assertEqual(ini.get_keys(), [])
+
+    def test_events_2(self):
+        '''Events match parse() for files and handles.'''
+        fname = 'tests/data/disjoint.ini'
+        ini = IniFile('m')
+        ini.parse(fname)
+        expected = from_parse(ini)
+        self.assertEqual(from_events(ini.iter_events(fname, chunk_size=3)), expected)
+        with open(fname, 'r') as fd:
+            self.assertEqual(from_events(ini.iter_events(fhandle=fd)), expected)
+
+    def test_events_3(self):
+        '''Events match parse() for random inputs and chunk sizes.'''
+        gen = Generator(random.Random(3))
+        for i in range(200):
+            text = gen.ini_file()
+            ini = IniFile('m')
+            try:
+                ini.parse(fstr=text)
+            except Exception:
+                continue
+            expected = from_parse(ini)
+            for chunk_size in [1, 7, 4096]:
+                events = ini.iter_events(fhandle=io.StringIO(text),
+                                         chunk_size=chunk_size)
+                self.assertEqual(from_events(events), expected, repr(text))
+
+    def test_events_4(self):
+        '''Stopping early.'''
+        ini = IniFile()
+        for event in ini.iter_events(fhandle=io.StringIO(''.join(
+                'key%d = %d\n' % (n, n) for n in range(1000)))):
+            if(event[1] == 'key10'):
+                break
+        self.assertEqual(event, (None, 'key10', [10], 11))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from dataclasses import dataclass
+from python_ini.ini_file import IniFile
+
+
+@dataclass
+class Config:
+    port: int
+    host: str
+    ratio: float
+    debug: bool
+
+
+class TestExtract(unittest.TestCase):
+    """Test bulk typed extraction."""
+
+    fstr = 'debug = off\n[server]\nport = 8080\nhost = example.com\nratio = 2\nids = 1 2 3\n'
+
+    def test_extract_1(self):
+        '''Extraction with conversions and defaults.'''
+        ini = IniFile()
+        ini.parse(fstr=self.fstr)
+        spec = {'port': ('server/port', int),
+                'host': ('server/host', str, 'localhost'),
+                'ratio': ('server/ratio', float),
+                'debug': ('debug', bool, True)}
+        self.assertEqual(ini.extract(spec), {'port': 8080, 'host': 'example.com',
+                                             'ratio': 2.0, 'debug': False})
+        config = ini.extract(spec, into=Config)
+        self.assertEqual(config, Config(8080, 'example.com', 2.0, False))
+        self.assertIsInstance(config.ratio, float)
+        result = ini.extract({'ids': ('server/ids', list),
+                              'port': (('server', 'port'), str),
+                              'timeout': ('server/timeout', int, None),
+                              'raw': ('server/ratio', None)})
+        self.assertEqual(result, {'ids': [3], 'port': '8080', 'timeout': None, 'raw': 2})
+        ini = IniFile('m')
+        ini.parse(fstr=self.fstr)
+        self.assertEqual(ini.extract({'ids': ('server/ids', float)}),
+                         {'ids': [1.0, 2.0, 3.0]})
+
+    def test_extract_2(self):
+        '''All errors are reported at once.'''
+        ini = IniFile()
+        ini.parse(fstr=self.fstr)
+        with self.assertRaises(Exception) as ctx:
+            ini.extract({'port': ('server/port', int),
+                         'host': ('host', str),
+                         'user': ('server/user', str),
+                         'ratio': ('server/host', float),
+                         'debug': ('server/port', bool)})
+        errors = ctx.exception.args[1]
+        self.assertEqual(len(errors), 4)
+        self.assertIn("host: key 'host' not found", errors[0])
+        self.assertIn("user: key 'server/user' not found", errors[1])
+        self.assertIn('ratio', errors[2])
+        self.assertIn('not a boolean', errors[3])
+
+    def test_extract_3(self):
+        '''Conversions that lose information are errors.'''
+        ini = IniFile('m')
+        ini.parse(fstr='a = 2.5\nb = true\nc = 3.0, 4\n')
+        for spec in [('a', int), ('b', int), ('b', float)]:
+            with self.assertRaises(Exception) as ctx:
+                ini.extract({'x': spec})
+            self.assertIn('not a', ctx.exception.args[1][0])
+        self.assertEqual(ini.extract({'c': ('c', int), 'a': ('a', float), 'b': ('b', str)}),
+                         {'c': [3, 4], 'a': [2.5], 'b': ['True']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from python_ini.ini_file import IniFile
+
+
+def ini_result(ini):
+    keys = {}
+    for key in ini.get_keys():
+        keys[key] = ini.get_values(key)
+    sections = {}
+    for section in ini.get_sections():
+        sections[section] = {}
+        for key in ini.get_section_keys(section):
+            sections[section][key] = ini.get_section_values(section, key)
+    return [keys, sections, ini.display_errors()]
+
+
+class TestFast(unittest.TestCase):
+    """Test that the fast engine matches the apg engine."""
+
+    def same(self, fname=None, fstr=None):
+        for values in ['s', 'm']:
+            apg = IniFile(values)
+            apg.parse(fname=fname, fstr=fstr)
+            fast = IniFile(values, engine='fast')
+            fast.parse(fname=fname, fstr=fstr)
+            self.assertEqual(ini_result(apg), ini_result(fast))
+
+    def test_fast_1(self):
+        '''Test data files.'''
+        self.same('tests/data/disjoint.ini')
+        self.same('tests/data/interior_quotes.ini')
+        self.same('tests/data/quoted_strings.ini')
+        self.same('tests/data/sections.ini')
+        self.same('tests/data/simple_global.ini')
+        self.same('tests/data/true_flag_globals.ini')
+
+    def test_fast_2(self):
+        '''Line continuations and their line counts.'''
+        self.same(fstr='a = 5/\n 6\n  x\n')
+        self.same(fstr='[a/b]\n  x\n')
+        self.same(fstr='a = "x/y" ; c/d\n[s] # a/b\nb = /\n\n  x\n')
+
+    def test_fast_3(self):
+        '''Values and value errors.'''
+        self.same(fstr='a = one\nb = 1.5.6, -, .5, 1e5 1E-2 5x\nc = ""\n')
+        self.same(fstr='a = \\xG0 \\u0041 \\U0010ffff\nb = \\ud800\nc = \\q\n')
+        self.same(fstr='  x\r\n[b\r\nk=1,,2\rl = "a\tb"\nm = ok')
+
+    def test_fast_4(self):
+        '''Engine argument.'''
+        with self.assertRaises(Exception) as ctx:
+            IniFile(engine='slow')
+        self.assertIn('engine must be', str(ctx.exception))
+        with self.assertRaises(Exception) as ctx:
+            ini = IniFile(engine='fast')
+            ini.parse(fstr='key = caf\xe9\n')
+        self.assertIn('internal error', str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import threading
+from python_ini.ini_file import IniFile
+from python_ini.parsed_ini import ParsedIni
+
+
+class TestFrozen(unittest.TestCase):
+    """Test the read-only parse result."""
+
+    fstr = 'a = 1, 2\nflag\n[s]\nb = "x\\x41"\nc = true\n[t]\nb = 3\n[bad\n'
+
+    def test_frozen_1(self):
+        '''The getters are the same as those of the parser.'''
+        for values in ['s', 'm']:
+            for engine in ['apg', 'fast']:
+                ini = IniFile(values, engine=engine, lazy=True)
+                ini.parse(fstr=self.fstr)
+                frozen = ini.freeze()
+                self.assertEqual(frozen.values, values)
+                self.assertEqual(frozen.errors, ini.errors)
+                self.assertEqual(frozen.display_errors(), ini.display_errors())
+                self.assertEqual(frozen.get_keys(), ini.get_keys())
+                self.assertEqual(frozen.get_sections(view=True), ini.get_sections(view=True))
+                self.assertEqual(frozen.get_section_keys('s'), ini.get_section_keys('s'))
+                self.assertEqual(frozen.get_section_keys('x', view=True), ())
+                for section in [None] + ini.get_sections() + ['x']:
+                    for key in ['a', 'b', 'c', 'flag', 'x']:
+                        if(section is None):
+                            expected = ini.get_values(key, 'none')
+                            value = frozen.get_values(key, 'none')
+                        else:
+                            expected = ini.get_section_values(section, key, 'none')
+                            value = frozen.get_section_values(section, key, 'none')
+                        if(values == 'm' and expected != 'none'):
+                            expected = tuple(expected)
+                        self.assertEqual(value, expected)
+                self.assertEqual(frozen['s/b'], 'xA' if(values == 's') else ('xA',))
+                self.assertEqual(frozen.get_many(['flag', ('t', 'b'), 'x/y']),
+                                 ini.get_many(['flag', ('t', 'b'), 'x/y']) if(values == 's')
+                                 else [(True,), (3,), None])
+                self.assertEqual(frozen.extract({'a': ('a', list), 'c': ('s/c', bool)}),
+                                 ini.extract({'a': ('a', list), 'c': ('s/c', bool)}))
+                with self.assertRaises(Exception):
+                    frozen.extract({'x': ('x', int)})
+
+    def test_frozen_2(self):
+        '''The result cannot be changed, by the parser or otherwise.'''
+        ini = IniFile('m')
+        ini.parse(fstr=self.fstr)
+        frozen = ini.freeze()
+        with self.assertRaises(TypeError):
+            frozen.sections['s']['b'] = (1,)
+        with self.assertRaises(TypeError):
+            frozen.global_keys['z'] = ()
+        with self.assertRaises(AttributeError):
+            frozen.get_values('a').append(3)
+        with self.assertRaises(AttributeError):
+            frozen.errors = None
+        ini.get_values('a').append(3)
+        ini.parse(fstr='a = 4\n')
+        self.assertEqual(frozen.get_values('a'), (1, 2))
+        self.assertEqual(dict(frozen.sections['t']), {'b': (3,)})
+        self.assertEqual(ini.freeze().get_sections(), [])
+        with self.assertRaises(Exception):
+            ParsedIni(({}, {}, None), values='x')
+
+    def test_frozen_3(self):
+        '''Many threads read while the parser parses other input.'''
+        ini = IniFile('s', engine='fast')
+        ini.parse(fstr=''.join('k%d = %d\n' % (i, i) for i in range(200)))
+        frozen = ini.freeze()
+        failures = []
+
+        def read():
+            for i in range(200):
+                if(frozen.get('k%d' % i) != i or frozen.get_values('k%d' % i) != i):
+                    failures.append(i)
+        threads = [threading.Thread(target=read) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(20):
+            ini.parse(fstr='k0 = %d\n' % (i + 1000))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        self.assertEqual(ini.get_values('k0'), 1019)
+
+
+if __name__ == '__main__':
+    unittest.main()
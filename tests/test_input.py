@@ -0,0 +1,89 @@
+import unittest
+import io
+import os
+import tempfile
+from array import array
+from python_ini.ini_file import IniFile, input_buffer
+
+
+class TestInput(unittest.TestCase):
+    """Test the input forms and the parser's input buffer."""
+
+    def test_input_1(self):
+        '''ASCII strings are parsed as bytes.'''
+        self.assertEqual(input_buffer('key = 1\n'), b'key = 1\n')
+        buffer = input_buffer('key = \xe9\n')
+        self.assertIsInstance(buffer, array)
+        self.assertEqual(buffer[6], 0xe9)
+
+    def test_input_2(self):
+        '''Binary file handles and bytes input.'''
+        fname = 'tests/data/sections.ini'
+        for engine in ['apg', 'fast']:
+            with open(fname, 'rb') as fd:
+                ini = IniFile(engine=engine)
+                ini.parse(fhandle=fd)
+                self.assertEqual(ini.get_sections(), ['SECTION1', '_SECTION_'])
+            ini = IniFile('m', engine=engine)
+            ini.parse(fstr=b'key = "a\\x41", 1.5 ; c\r\n[s]\r\nkey\r\n')
+            self.assertEqual(ini.get_values('key'), ['aA', 1.5])
+            self.assertEqual(ini.get_section_values('s', 'key'), [True])
+
+    def test_input_3(self):
+        '''Non-ASCII input is rejected by the parser.'''
+        for fstr in ['key = caf\xe9\n', 'key = caf\xc3\xa9\n'.encode('latin-1')]:
+            with self.assertRaises(Exception) as ctx:
+                ini = IniFile()
+                ini.parse(fstr=fstr)
+            self.assertIn('internal error', str(ctx.exception))
+
+    def test_input_4(self):
+        '''Memory-mapped files.'''
+        for fname in ['tests/data/disjoint.ini', 'tests/data/quoted_strings.ini',
+                      'tests/data/interior_quotes.ini']:
+            for engine in ['apg', 'fast']:
+                ini = IniFile('m', engine=engine)
+                ini.parse(fname)
+                mapped = IniFile('m', engine=engine)
+                mapped.parse(fname, mmap=True)
+                self.assertEqual(mapped.get_sections(), ini.get_sections())
+                self.assertEqual(mapped.display_errors(), ini.display_errors())
+                for section in ini.get_sections():
+                    for key in ini.get_section_keys(section):
+                        self.assertEqual(
+                            mapped.get_section_values(section, key),
+                            ini.get_section_values(section, key))
+
+    def test_input_5(self):
+        '''Memory-mapped empty file.'''
+        fd, fname = tempfile.mkstemp(suffix='.ini')
+        os.close(fd)
+        try:
+            ini = IniFile()
+            ini.parse(fname, mmap=True)
+            self.assertEqual(ini.errors, None)
+            self.assertEqual(ini.get_keys(), [])
+        finally:
+            os.remove(fname)
+
+    def test_input_6(self):
+        '''Chunked file handles.'''
+        fstr = 'a = 5/\n 6\n  x\r\n[s]\r\nkey = "a\\x41", / c\r 2\n[b\nk=1,,2\nm = ok'
+        for engine in ['apg', 'fast']:
+            ini = IniFile('m', engine=engine)
+            ini.parse(fstr=fstr)
+            for chunk_size in [1, 2, 3, 64]:
+                chunked = IniFile('m', engine=engine)
+                chunked.parse(fhandle=io.StringIO(fstr, newline=''),
+                              chunk_size=chunk_size)
+                self.assertEqual(chunked.get_values('a'), [5, 6])
+                self.assertEqual(chunked.get_section_values('s', 'key'), ['aA', 2])
+                self.assertEqual(chunked.get_section_values('s', 'm'), ['ok'])
+                self.assertEqual(chunked.display_errors(), ini.display_errors())
+                chunked.parse(fhandle=io.BytesIO(fstr.encode('ascii')),
+                              chunk_size=chunk_size)
+                self.assertEqual(chunked.display_errors(), ini.display_errors())
+
+
+if __name__ == '__main__':
+    unittest.main()
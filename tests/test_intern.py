@@ -0,0 +1,65 @@
+import unittest
+from python_ini.ini_file import IniFile
+from python_ini.schema import Schema, Key
+from tests.test_fast import ini_result
+
+
+class TestIntern(unittest.TestCase):
+    """Test the interning of names and short values."""
+
+    long_value = 'x' * 100
+    fstr = ('name = "tenant"\n[database]\nhost = localhost\nport = 5432\n'
+            'options = "%s", /\n  readonly\n[database]\nhost = "local\\x41"\n' % long_value)
+
+    def parse(self, **kwargs):
+        ini = IniFile('m', intern=True, **kwargs)
+        ini.parse(fstr=(self.fstr + ' ')[:-1])
+        return ini
+
+    def test_intern_1(self):
+        '''Names and short values are shared between parses.'''
+        for kwargs in [{}, {'engine': 'fast'}, {'editable': True}, {'lazy': True}]:
+            one = self.parse(**kwargs)
+            two = self.parse(**kwargs)
+            plain = IniFile('m', **kwargs)
+            plain.parse(fstr=self.fstr)
+            self.assertEqual(ini_result(one), ini_result(plain))
+            self.assertIs(one.get_keys()[0], two.get_keys()[0])
+            self.assertIs(one.get_sections()[0], two.get_sections()[0])
+            self.assertIs(one.get_section_keys('database')[0],
+                          two.get_section_keys('database')[0])
+            host = one.get_section_values('database', 'host')
+            self.assertIs(host[0], two.get_section_values('database', 'host')[0])
+            self.assertIs(one.get_values('name')[0], two.get_values('name')[0])
+            # escaped values, decoded on first use if lazy
+            escaped = one.get_section_values('database', 'host')
+            self.assertEqual(escaped, ['localhost', 'localA'])
+            self.assertIs(escaped[1], two.get_section_values('database', 'host')[1])
+            # long values are not interned
+            options = one.get_section_values('database', 'options')
+            self.assertEqual(options, [self.long_value, 'readonly'])
+            self.assertIsNot(options[0], two.get_section_values('database', 'options')[0])
+
+    def test_intern_2(self):
+        '''Interned strings from a pool process stay interned.'''
+        fname = 'tests/data/sections.ini'
+        results = [ini for name, ini, seconds in IniFile.parse_many([fname, fname], workers=2,
+                                                                    intern=True)]
+        self.assertIs(results[0].get_sections()[1], results[1].get_sections()[1])
+        self.assertIs(results[0].get_section_keys('SECTION1')[0],
+                      results[1].get_section_keys('SECTION1')[0])
+
+    def test_intern_3(self):
+        '''Escaped values decoded by a schema check are interned.'''
+        schema = Schema({None: {'a': Key(str, choices=['xA', 'y'])}})
+        results = []
+        for i in range(2):
+            ini = IniFile(intern=True, lazy=True, schema=schema)
+            ini.parse(fstr='a = "x\\x41"\n')
+            results.append(ini.get_values('a'))
+        self.assertEqual(results[0], 'xA')
+        self.assertIs(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
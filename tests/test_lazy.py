@@ -0,0 +1,45 @@
+import unittest
+import io
+from python_ini.ini_file import IniFile
+from python_ini.ast_callbacks import LazyValue
+
+
+class TestLazy(unittest.TestCase):
+    """Test lazy value decoding."""
+
+    fstr = 'a = "x\\x41", \\ty, 1.5, 2, plain\n[s]\nb = \'\\u0042\\U0001F600\'\nc = \\ud800\n'
+
+    def test_lazy_1(self):
+        '''Lazy values are decoded on first access and kept.'''
+        for engine in ['apg', 'fast']:
+            ini = IniFile('m', engine=engine, lazy=True)
+            ini.parse(fstr=self.fstr)
+            values = ini.get_values('a')
+            self.assertEqual(values, ['xA', '\ty', 1.5, 2, 'plain'])
+            self.assertIs(ini.get_values('a'), values)
+            ini = IniFile(engine=engine, lazy=True)
+            ini.parse(fstr=self.fstr)
+            self.assertEqual(ini.get_values('a'), 'plain')
+            self.assertEqual(ini.get_section_values('s', 'b'), 'B\U0001F600')
+            self.assertEqual(ini.get_section_values('s', 'c', 'none'), 'none')
+
+    def test_lazy_2(self):
+        '''Escaped strings are not decoded by the parse.'''
+        for engine in ['apg', 'fast']:
+            for chunked in [False, True]:
+                ini = IniFile('m', engine=engine, lazy=True)
+                if(chunked):
+                    ini.parse(fhandle=io.StringIO(self.fstr), chunk_size=4)
+                else:
+                    ini.parse(fstr=self.fstr)
+                data = ini._IniFile__data
+                values = data['global']['a']
+                self.assertIsInstance(values[0], LazyValue)
+                self.assertIsInstance(values[1], LazyValue)
+                self.assertEqual(values[2:], [1.5, 2, 'plain'])
+                # errors are reported by the parse
+                self.assertIn('line: 4', ini.display_errors())
+
+
+if __name__ == '__main__':
+    unittest.main()
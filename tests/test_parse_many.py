@@ -0,0 +1,36 @@
+import unittest
+from python_ini.ini_file import IniFile
+from tests.test_fast import ini_result
+
+FILES = ['tests/data/disjoint.ini', 'tests/data/interior_quotes.ini',
+         'tests/data/quoted_strings.ini', 'tests/data/sections.ini',
+         'tests/data/simple_global.ini', 'tests/data/true_flag_globals.ini']
+
+
+class TestParseMany(unittest.TestCase):
+    """Test parallel parsing of many files."""
+
+    def test_parse_many_1(self):
+        '''Results match single file parses.'''
+        for engine in ['apg', 'fast']:
+            results = {}
+            for fname, ini, seconds in IniFile.parse_many(
+                    FILES, workers=2, values='m', engine=engine):
+                self.assertGreater(seconds, 0)
+                results[fname] = ini_result(ini)
+            self.assertEqual(sorted(results), sorted(FILES))
+            for fname in FILES:
+                ini = IniFile('m')
+                ini.parse(fname)
+                self.assertEqual(results[fname], ini_result(ini))
+
+    def test_parse_many_2(self):
+        '''Errors.'''
+        with self.assertRaises(Exception):
+            list(IniFile.parse_many(FILES, values='x'))
+        with self.assertRaises(FileNotFoundError):
+            list(IniFile.parse_many(['tests/data/missing.ini'], workers=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from python_ini.ini_file import IniFile
+from python_ini.parsed_ini import ParsedIni
+
+
+class TestPaths(unittest.TestCase):
+    """Test the key path index."""
+
+    fstr = 'a = 1, 2\nflag\n[SECTION.1.1]\nnumber = 3\nb = "x\\x41"\n[s]\na = 4\n'
+
+    def test_paths_1(self):
+        '''Single-valued paths.'''
+        ini = IniFile(lazy=True)
+        ini.parse(fstr=self.fstr)
+        self.assertEqual(ini['a'], 2)
+        self.assertEqual(ini['flag'], True)
+        self.assertEqual(ini['SECTION.1.1/number'], 3)
+        self.assertEqual(ini['SECTION.1.1/b'], 'xA')
+        self.assertEqual(ini[('s', 'a')], 4)
+        self.assertEqual(ini[(None, 'a')], 2)
+        with self.assertRaises(KeyError):
+            ini['s/b']
+        self.assertEqual(ini.get('s/b'), None)
+        self.assertEqual(ini.get('s/b', 'default'), 'default')
+        self.assertEqual(ini.get_many(['a', 's/a', 'x'], 0), [2, 4, 0])
+        # re-parse
+        ini.parse(fstr='[s]\na = 5\n')
+        self.assertEqual(ini.get_many(['a', 's/a']), [None, 5])
+
+    def test_paths_2(self):
+        '''Multi-valued paths and separators.'''
+        ini = IniFile('m', path_sep=':')
+        ini.parse(fstr=self.fstr)
+        self.assertEqual(ini['a'], [1, 2])
+        self.assertEqual(ini['flag'], [True])
+        self.assertEqual(ini['SECTION.1.1:number'], [3])
+        self.assertEqual(ini['s:a'], ini.get_section_values('s', 'a'))
+        with self.assertRaises(Exception):
+            IniFile(path_sep='')
+        # "a.b" would be both the global key and the key "b" in section "a"
+        for path_sep in ['.', '_', '..', 'x']:
+            with self.assertRaises(Exception):
+                IniFile(path_sep=path_sep)
+        ini = IniFile(path_sep='.:')
+        ini.parse(fstr='a.b = 1\n[a]\nb = 2\n')
+        self.assertEqual(ini.get_many(['a.b', 'a.:b']), [1, 2])
+        with self.assertRaises(Exception):
+            ParsedIni(ini._export(), path_sep='.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import gc
+import threading
+import tracemalloc
+from python_ini.ini_file import IniFile
+from python_ini.pipeline import get_pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    """Test the shared parser pipeline."""
+
+    def test_pipeline_1(self):
+        '''One pipeline per debug mode.'''
+        self.assertIs(get_pipeline(), get_pipeline(False))
+        self.assertIsNot(get_pipeline(), get_pipeline(True))
+
+    def test_pipeline_2(self):
+        '''Concurrent parsing with the shared pipeline.'''
+        results = []
+
+        def work(n):
+            for i in range(5):
+                ini = IniFile()
+                ini.parse(fstr='key = %d\n[sec]\nkey = "%d"\n' % (n, n))
+                results.append(ini.get_values('key') == n
+                               and ini.get_section_values('sec', 'key') == str(n))
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(results), 40)
+        self.assertTrue(all(results))
+
+    def test_pipeline_3(self):
+        '''The pipeline does not keep the last parse alive.'''
+        fstr = ''.join('key%d = %d, "value%d"\n' % (i, i, i) for i in range(2000))
+        IniFile().parse(fstr='a = 1\n')
+        gc.collect()
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            ini = IniFile()
+            ini.parse(fstr=fstr)
+            self.assertEqual(ini.get_values('key1999'), 'value1999')
+            parsed = tracemalloc.get_traced_memory()[0]
+            del ini
+            gc.collect()
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(parsed - before, 200000)
+        self.assertLess(after - before, 100000)
+
+
+if __name__ == '__main__':
+    unittest.main()
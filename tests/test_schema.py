@@ -0,0 +1,91 @@
+import unittest
+import io
+from python_ini.ini_file import IniFile
+from python_ini.schema import Schema, Key
+from tests.test_fast import ini_result
+
+
+class TestSchema(unittest.TestCase):
+    """Test schema validation while parsing."""
+
+    schema = Schema({
+        None: {'debug': bool, 'name': str},
+        'server': {
+            'port': Key(int, min=1, max=65535),
+            'host': str,
+            'mode': Key(str, choices=['fast', 'safe']),
+            'ratio': float,
+            'hosts': Key(str, multi=True)}})
+
+    fstr = ('debug = yes\nname = 42\nextra = 1\n'
+            '[server]\nport = 0, 80\nhost = "local\\x41"\nratio = 2\n'
+            'hosts = a, b, /\n  c\nmode = slow\n'
+            '[other]\nx = 1\n[server]\nport = 1\n')
+
+    def test_schema_1(self):
+        '''Validation and conversion, with every engine and input.'''
+        results = []
+        for engine in ['apg', 'fast']:
+            for lazy in [False, True]:
+                ini = IniFile('m', engine=engine, lazy=lazy, schema=self.schema)
+                ini.parse(fstr=self.fstr)
+                results.append(ini_result(ini))
+                ini.parse(fhandle=io.StringIO(self.fstr), chunk_size=7)
+                results.append(ini_result(ini))
+        for result in results:
+            self.assertEqual(result, results[0])
+        ini = IniFile('m', schema=self.schema)
+        ini.parse(fstr=self.fstr)
+        self.assertEqual(ini.get_values('debug'), [True])
+        self.assertEqual(ini.get_values('name'), ['42'])
+        self.assertEqual(ini.get_values('extra'), None)
+        self.assertEqual(ini.get_section_keys('server'), ['port', 'host', 'ratio', 'hosts'])
+        self.assertEqual(ini.get_section_values('server', 'port'), [80])
+        self.assertEqual(ini.get_section_values('server', 'host'), ['localA'])
+        self.assertEqual(ini.get_section_values('server', 'ratio'), [2.0])
+        self.assertIs(type(ini.get_section_values('server', 'ratio')[0]), float)
+        self.assertEqual(ini.get_section_values('server', 'hosts'), ['a', 'b', 'c'])
+        self.assertEqual(ini.get_section_values('server', 'mode'), None)
+        self.assertEqual(ini.get_sections(), ['server'])
+        errors = ini.display_errors()
+        for expected in ['line: 3, message: schema: unknown key "extra"',
+                         'line: 10, message: schema: key "mode": \'slow\' is not one of',
+                         'line: 11, message: schema: unknown section "other"',
+                         'line: 5, message: schema: key "port": 0 is less than the minimum 1',
+                         'line: 14, message: schema: key "port" may have only one value']:
+            self.assertIn(expected, errors)
+        self.assertEqual(len(errors.splitlines()), 5)
+
+    def test_schema_2(self):
+        '''Schema errors are sorted with the syntax errors.'''
+        schema = Schema({None: {'a': int}})
+        for engine in ['apg', 'fast']:
+            ini = IniFile(engine=engine, schema=schema)
+            ini.parse(fstr='a = x\n= 1\nb = 1\n')
+            self.assertEqual(ini.display_errors(),
+                             '{line: 1, message: schema: key "a": expected int, found \'x\'}\n'
+                             '{line: 2, message: bad key/value definition}\n'
+                             '{line: 3, message: schema: unknown key "b"}\n')
+            self.assertEqual(ini.get_keys(), [])
+
+    def test_schema_3(self):
+        '''Unknown sections and keys.'''
+        schema = Schema({'s': {'a': int}}, unknown_sections=True, unknown_keys=True)
+        ini = IniFile(schema=schema)
+        ini.parse(fstr='g = x\n[s]\na = 1\nb = x\n[t]\nc = y\n')
+        self.assertEqual(ini.errors, None)
+        self.assertEqual(ini.get_values('g'), 'x')
+        self.assertEqual(ini.get_section_values('s', 'b'), 'x')
+        self.assertEqual(ini.get_section_values('t', 'c'), 'y')
+        ini.parse(fstr='[s]\na = x\n')
+        self.assertIn('expected int', ini.display_errors())
+        # key flags are not checked
+        ini.parse(fstr='[s]\na\n')
+        self.assertEqual(ini.errors, None)
+        self.assertEqual(ini.get_section_values('s', 'a'), True)
+        with self.assertRaises(Exception):
+            Key(list)
+
+
+if __name__ == '__main__':
+    unittest.main()
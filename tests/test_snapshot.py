@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+from python_ini.ini_file import IniFile
+import python_ini.snapshot as snapshot
+from tests.test_fast import ini_result
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test the binary snapshots of parsed data."""
+
+    fstr = ('a = 1, -2, 1.5, -1e300, yes, off, null, 99999999999999999999\n'
+            'b = "x\\u00e9\\U0001F600", \'\', plain\n'
+            '[s]\nb = -9223372036854775808, 9223372036854775808\nflag\n[bad\n[empty]\n')
+
+    def test_snapshot_1(self):
+        '''Round trip.'''
+        for values in ['s', 'm']:
+            ini = IniFile(values)
+            ini.parse(fstr=self.fstr)
+            loaded = IniFile(values)
+            loaded.load_snapshot(ini.dump_snapshot())
+            self.assertEqual(ini_result(loaded), ini_result(ini))
+            self.assertEqual(loaded._export(), ini._export())
+            loaded.parse(fstr='a = 1')
+            loaded.load_snapshot(loaded.dump_snapshot())
+            self.assertEqual(loaded.get_values('a'), 1 if(values == 's') else [1])
+            self.assertEqual(loaded.errors, None)
+
+    def test_snapshot_2(self):
+        '''Snapshot files.'''
+        fd, fname = tempfile.mkstemp(suffix='.snap')
+        os.close(fd)
+        try:
+            ini = IniFile('m')
+            ini.parse(fstr=self.fstr)
+            data = ini.dump_snapshot(fname)
+            with open(fname, 'rb') as fd:
+                self.assertEqual(fd.read(), data)
+            loaded = IniFile('m')
+            loaded.load_snapshot(fname=fname)
+            self.assertEqual(loaded._export(), ini._export())
+            open(fname, 'wb').close()
+            with self.assertRaises(Exception):
+                loaded.load_snapshot(fname=fname)
+        finally:
+            os.remove(fname)
+
+    def test_snapshot_3(self):
+        '''Invalid snapshots.'''
+        ini = IniFile()
+        ini.parse(fstr=self.fstr)
+        data = ini.dump_snapshot()
+        self.assertEqual(data[:8], snapshot.MAGIC)
+        for bad in [b'', b'PYINISNQ' + data[8:], data[:8] + b'\x02' + data[9:],
+                    data[:-1], data[:40]]:
+            with self.assertRaises(Exception) as ctx:
+                ini.load_snapshot(bad)
+            self.assertIn('snapshot', str(ctx.exception))
+
+
+    def test_snapshot_4(self):
+        '''Corrupt string tables.'''
+        ini = IniFile()
+        ini.parse(fstr=self.fstr)
+        data = ini.dump_snapshot()
+        count, length = snapshot.HEADER.unpack_from(data)[3:]
+        ends = list(snapshot.struct.unpack_from('<%dI' % count, data, snapshot.HEADER.size))
+
+        def table(ends):
+            return (data[:snapshot.HEADER.size] + snapshot.struct.pack('<%dI' % count, *ends) +
+                    data[snapshot.HEADER.size + 4 * count:])
+        self.assertEqual(table(ends), data)
+        # decreasing, short of and past the string data length
+        for bad in [[ends[1]] + ends[1:2] + [ends[0]] + ends[3:], ends[:-1] + [length - 1],
+                    ends[:-1] + [length + 1]]:
+            with self.assertRaises(Exception) as ctx:
+                ini.load_snapshot(table(bad))
+            self.assertIn('snapshot', str(ctx.exception))
+        with self.assertRaises(Exception):
+            ini.load_snapshot(data + b'\0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from python_ini.ast_callbacks import string_eval
+
+
+class TestStringEval(unittest.TestCase):
+    """Test the evaluation of escaped characters in string values."""
+
+    def test_string_eval_1(self):
+        '''Single-character escapes.'''
+        self.assertEqual(string_eval('plain'), 'plain')
+        self.assertEqual(string_eval('\\\\\\/\\"\\#\\\'\\,\\:\\;\\='), '\\/"#\',:;=')
+        self.assertEqual(string_eval('a\\bb\\tc\\nd\\re'), 'a b\tc\nd\re')
+
+    def test_string_eval_2(self):
+        '''Hexadecimal and Unicode escapes.'''
+        self.assertEqual(string_eval('\\x41\\xfFz'), 'A\xffz')
+        self.assertEqual(string_eval('\\u0041\\uFFFD'), 'A�')
+        self.assertEqual(string_eval('\\U0001F600\\U0010ffff'), '\U0001F600\U0010ffff')
+        # the grammar's hex digits accept G and H
+        self.assertEqual(string_eval('\\xG0'), chr(256))
+        self.assertEqual(string_eval('\\xH1x'), chr(273) + 'x')
+
+    def test_string_eval_3(self):
+        '''Long values with runs of unescaped characters.'''
+        text = ('x' * 1000 + '\\x41') * 100
+        self.assertEqual(string_eval(text), ('x' * 1000 + 'A') * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from python_ini.ini_file import IniFile
+
+
+class TestViews(unittest.TestCase):
+    """Test the read-only key and section name views."""
+
+    def test_views_1(self):
+        '''Views are built once per parse.'''
+        ini = IniFile()
+        ini.parse(fstr='a = 1\nb = 2\n[s]\nc = 3\n[t]\n')
+        keys = ini.get_keys(view=True)
+        self.assertEqual(keys, ('a', 'b'))
+        self.assertIs(ini.get_keys(view=True), keys)
+        self.assertEqual(ini.get_sections(view=True), ('s', 't'))
+        self.assertEqual(ini.get_section_keys('s', view=True), ('c',))
+        self.assertEqual(ini.get_section_keys('t', view=True), ())
+        self.assertEqual(ini.get_section_keys('u', view=True), ())
+        # lists are copies
+        ini.get_keys().append('x')
+        self.assertEqual(ini.get_keys(), ['a', 'b'])
+        self.assertEqual(ini.get_section_keys('u'), [])
+        # re-parse
+        ini.parse(fstr='d = 1\n[u]\ne\n')
+        self.assertEqual(ini.get_keys(view=True), ('d',))
+        self.assertEqual(ini.get_sections(view=True), ('u',))
+        self.assertEqual(ini.get_section_keys('s', view=True), ())
+        self.assertEqual(ini.get_section_keys('u', view=True), ('e',))
+        ini.load_snapshot(IniFile().dump_snapshot())
+        self.assertEqual(ini.get_keys(view=True), ())
+
+
+if __name__ == '__main__':
+    unittest.main()
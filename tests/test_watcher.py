@@ -0,0 +1,119 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+from python_ini.watcher import IniWatcher
+
+
+class TestWatcher(unittest.TestCase):
+    """Test the hot reloading of INI files."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.fname = os.path.join(self.directory, 'watched.ini')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, rename=False):
+        if(rename):
+            temp = self.fname + '.tmp'
+            with open(temp, 'w') as fd:
+                fd.write(text)
+            os.replace(temp, self.fname)
+        else:
+            with open(self.fname, 'w') as fd:
+                fd.write(text)
+
+    def wait(self, condition):
+        deadline = time.time() + 5
+        while(not condition()):
+            if(time.time() > deadline):
+                self.fail('timed out')
+            time.sleep(0.01)
+
+    def watch(self, use_inotify):
+        reloads = []
+        errors = []
+        self.write('a = 1\n')
+        watcher = IniWatcher(self.fname, interval=0.01, debounce=0.05, use_inotify=use_inotify,
+                             on_reload=reloads.append, on_error=errors.append)
+        with watcher:
+            first = watcher.ini
+            self.assertEqual(first.get_values('a'), 1)
+            self.assertEqual(watcher.reloads, 1)
+            # a burst of writes is parsed once
+            for i in range(2, 12):
+                self.write('a = %d\n' % i)
+            self.wait(lambda: watcher.ini.get_values('a') == 11)
+            self.assertEqual(watcher.reloads, 2)
+            self.assertEqual(reloads, [first, watcher.ini])
+            self.assertGreater(watcher.latency, 0)
+            # a file with errors is not published
+            self.write('a = 222\n[bad\n')
+            self.wait(lambda: watcher.failures == 1)
+            self.assertIn('bad section', errors[0])
+            self.assertEqual(watcher.ini.get_values('a'), 11)
+            # a file replaced by a rename
+            self.write('a = 3333\n', rename=True)
+            self.wait(lambda: watcher.ini.get_values('a') == 3333)
+            # a missing file
+            os.remove(self.fname)
+            self.wait(lambda: watcher.failures == 2)
+            self.assertEqual(watcher.ini.get_values('a'), 3333)
+        self.assertEqual(watcher.reloads, 3)
+        self.assertEqual(len(errors), 2)
+        return watcher
+
+    def test_watcher_1(self):
+        '''Polling.'''
+        watcher = self.watch(False)
+        self.assertEqual(watcher.mode, 'poll')
+
+    def test_watcher_2(self):
+        '''inotify, where available.'''
+        watcher = self.watch(True)
+        self.assertIn(watcher.mode, ['inotify', 'poll'])
+
+    def test_watcher_3(self):
+        '''No file without errors yet.'''
+        with IniWatcher(self.fname, interval=0.01, debounce=0.01) as watcher:
+            self.assertEqual(watcher.ini, None)
+            self.assertEqual(watcher.failures, 1)
+            self.write('[s]\nb = x\n')
+            self.wait(lambda: watcher.ini is not None)
+            self.assertEqual(watcher.ini.get_section_values('s', 'b'), 'x')
+            with self.assertRaises(Exception):
+                watcher.start()
+
+
+    def test_watcher_4(self):
+        '''Failing callbacks and empty files.'''
+        calls = []
+
+        def fail(argument):
+            calls.append(argument)
+            raise ValueError('callback')
+        self.write('a = 1\n')
+        with IniWatcher(self.fname, interval=0.01, debounce=0.02, use_inotify=False,
+                        on_reload=fail, on_error=fail) as watcher:
+            self.assertEqual((watcher.reloads, watcher.failures), (1, 1))
+            self.assertIn('callback', watcher.errors)
+            # a truncated file is not published
+            self.write('')
+            self.wait(lambda: watcher.failures == 3)
+            self.assertIn('empty file', calls[1])
+            self.assertEqual(watcher.ini.get_values('a'), 1)
+            # the watcher is still running
+            self.write('a = 2\n')
+            self.wait(lambda: watcher.reloads == 2)
+            self.assertEqual(watcher.ini.get_values('a'), 2)
+        self.write('')
+        with IniWatcher(self.fname, publish_empty=True) as watcher:
+            self.assertEqual(watcher.ini.get_keys(), [])
+            watcher.reload()
+            self.assertEqual((watcher.reloads, watcher.failures), (2, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ import os
 # if using autopep8 formatter, for example, set argument '--ignore=E402'
 sys.path.append(os.getcwd())
 import unittest
+import io
 from python_ini.ini_writer import IniWriter
 from python_ini.ini_file import IniFile
 
@@ -164,6 +165,63 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(ini.errors, None)
         os.remove(fname)
 
+    def test_string_escapes(self):
+        '''Test the escaped characters of string values.'''
+        w = IniWriter()
+        w.key('a', 'printable ASCII \\ \' "')
+        w.key('b', 'tab\tlf\ncr\r\x00\x7f\xe9\xff')
+        w.key('c', '\u0100\ud7ff\ue000\uffff\U00010000\U0010ffff')
+        file = w.to_string()
+        self.assertIn("a = 'printable ASCII \\ ' \"'\n", file)
+        self.assertIn("b = 'tab\\tlf\\ncr\\r\\x00\\x7f\\xe9\\xff'\n", file)
+        self.assertIn(
+            "c = '\\u0100\\ud7ff\\ue000\\uffff\\U00010000\\U0010ffff'\n", file)
+        ini = IniFile()
+        ini.parse(fstr='\n'.join(file.split('\n')[1:]))
+        self.assertEqual(ini.get_values('b'), 'tab\tlf\ncr\r\x00\x7f\xe9\xff')
+        self.assertEqual(ini.get_values('c'),
+                         '\u0100\ud7ff\ue000\uffff\U00010000\U0010ffff')
+        with self.assertRaises(Exception):
+            w.key('d', 'surrogate\udfff')
+
+    def test_write_stream(self):
+        '''Test writing to a file handle, one line at a time.'''
+        w = IniWriter()
+        make_ini(w)
+        w.comment_tab(10)
+        lines = list(w.iter_lines())
+        self.assertEqual(''.join(lines), w.to_string())
+        for line in lines:
+            self.assertEqual(line.count('\n'), 1)
+            self.assertTrue(line.endswith('\n'))
+        self.assertEqual(lines[4], 'floats = 1.0, -0.3, -30.0\n')
+        self.assertEqual(lines[5], '          ; floating point numbers\n')
+        fhandle = io.StringIO()
+        w.write_stream(fhandle)
+        self.assertEqual(fhandle.getvalue(), w.to_string())
+
+    def test_streaming(self):
+        '''Test the streaming writer.'''
+        w = IniWriter()
+        make_ini(w)
+        fhandle = io.StringIO()
+        with IniWriter(fhandle=fhandle) as s:
+            make_ini(s)
+            with self.assertRaises(Exception):
+                s.to_string()
+        self.assertEqual(fhandle.getvalue(), w.to_string())
+        with self.assertRaises(Exception):
+            s.comment('closed')
+        fname = 'tests/data/temp.ini'
+        s = IniWriter(fname)
+        s.key('a', 1)
+        s.comment_tab(10)
+        s.key('b', 2, 'comment')
+        s.close()
+        with open(fname) as fd:
+            self.assertEqual(fd.read(), 'a = 1\nb = 2     ; comment\n')
+        os.remove(fname)
+
 
 if __name__ == '__main__':
     unittest.main()